@@ -77,6 +77,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'admin_panel.context_processors.platform_settings',
+                'orders.context_processors.cart',
             ],
         },
     },
@@ -102,6 +103,38 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Point this at a shared backend (Memcached/Redis) in production so cache
+# invalidation, e.g. of the platform settings, reaches every worker process.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'food-ordering-platform',
+    }
+}
+
+# Seconds the version stamps behind the platform settings, public page and
+# order board caches live. The local-memory cache is per process, so a worker
+# only picks up a change made in another worker once its stamp expires; this
+# bounds how stale it can get. Set it to None with a shared cache backend.
+
+CACHE_VERSION_TIMEOUT = 30
+
+# Order events
+# Broker used to push order status changes to open Server-Sent Events streams.
+# The local broker only reaches streams served by the same process; use a
+# shared implementation of orders.events.BaseBroker with several workers.
+
+ORDER_EVENTS_BROKER = 'orders.events.LocalBroker'
+
+# Where carts live until checkout. The database cart keeps a pending Order per
+# user; 'orders.cart.SessionCart' keeps the cart in the session and only writes
+# the order tables at checkout.
+
+ORDER_CART_BACKEND = 'orders.cart.DatabaseCart'
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
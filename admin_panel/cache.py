@@ -0,0 +1,125 @@
+import hashlib
+import threading
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.middleware.csrf import get_token
+
+# Version stamps shared by every worker through the configured cache backend.
+# Each process keeps its own copy of the settings row and reloads it only when
+# the stamp it was loaded under no longer matches the shared one.
+SETTINGS_VERSION_KEY = 'platform_settings:version'
+PAGE_CACHE_VERSION_KEY = 'page_cache:version'
+PAGE_CACHE_TIMEOUT = 60 * 5
+
+# Stamps expire after this many seconds (None: never). With a per-process cache a
+# worker only sees another worker's bump once its own stamp expires, so this
+# bounds how long it can serve stale data.
+DEFAULT_VERSION_TIMEOUT = 30
+
+
+def get_version_timeout():
+    """Return how long version stamps live in the cache, from CACHE_VERSION_TIMEOUT"""
+    return getattr(settings, 'CACHE_VERSION_TIMEOUT', DEFAULT_VERSION_TIMEOUT)
+
+_lock = threading.Lock()
+_local = {'version': None, 'settings': None}
+
+
+def get_version(key, timeout=None):
+    """Return the version stamp stored under key, publishing one if missing or expired.
+
+    ``timeout`` caps the stamp's lifetime below CACHE_VERSION_TIMEOUT.
+    """
+    version = cache.get(key)
+    if version is None:
+        # First worker to see an empty cache publishes a stamp; the others adopt it
+        cache.add(key, uuid.uuid4().hex, timeout=_stamp_timeout(timeout))
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key, timeout=None):
+    """Publish a new version stamp under key"""
+    cache.set(key, uuid.uuid4().hex, timeout=_stamp_timeout(timeout))
+
+
+def _stamp_timeout(timeout):
+    default = get_version_timeout()
+    if default is None or timeout is None:
+        return default
+    return min(default, timeout)
+
+
+def get_settings_version():
+    """Return the current platform settings version stamp"""
+    return get_version(SETTINGS_VERSION_KEY)
+
+
+def get_cached_settings():
+    """Get the platform settings from the process-local copy, reloading when stale"""
+    version = get_settings_version()
+    settings = _local['settings']
+    if settings is not None and _local['version'] == version:
+        return settings
+
+    from .models import PlatformSettings
+    settings = PlatformSettings.get_settings()
+    with _lock:
+        _local['version'] = version
+        _local['settings'] = settings
+    return settings
+
+
+def invalidate_platform_settings():
+    """Publish a new version stamp so every worker reloads its copy on next read"""
+    bump_version(SETTINGS_VERSION_KEY)
+    with _lock:
+        _local['version'] = None
+        _local['settings'] = None
+
+
+def get_page_cache_key(request):
+    """Build the cache key for a public page from its URL and the current versions"""
+    path_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return 'page_cache:{}:{}:{}'.format(
+        get_version(PAGE_CACHE_VERSION_KEY), get_settings_version(), path_hash
+    )
+
+
+def invalidate_public_pages():
+    """Drop every cached public page"""
+    bump_version(PAGE_CACHE_VERSION_KEY)
+
+
+def public_page_cache(timeout=PAGE_CACHE_TIMEOUT):
+    """Decorator to serve a public view from the cache for anonymous visitors.
+
+    Authenticated users, non-GET requests and requests with pending flash
+    messages always get a fresh render. Every POST reachable from the cached
+    pages requires login, so the CSRF token baked into a cached page is never
+    used; a fresh token is still issued so the visitor gets a CSRF cookie.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated
+                    or len(messages.get_messages(request))):
+                return view_func(request, *args, **kwargs)
+
+            key = get_page_cache_key(request)
+            response = cache.get(key)
+            if response is not None:
+                get_token(request)
+                return response
+
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming and not response.cookies:
+                cache.set(key, response, timeout)
+            return response
+        return wrapper
+    return decorator
@@ -1,6 +1,8 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .cache import invalidate_platform_settings
+
 
 class PlatformSettings(models.Model):
     """Platform-wide settings that affect the entire website"""
@@ -61,7 +63,15 @@ class PlatformSettings(models.Model):
                     setattr(existing, field.name, getattr(self, field.name))
             existing.save()
             return existing
-        return super().save(*args, **kwargs)
+        result = super().save(*args, **kwargs)
+        # Let every worker drop its cached copy once the new values are committed
+        transaction.on_commit(invalidate_platform_settings)
+        return result
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        transaction.on_commit(invalidate_platform_settings)
+        return result
     
     @classmethod
     def get_settings(cls):
@@ -11,8 +11,10 @@ import json
 from users.models import User
 from restaurants.models import Restaurant
 from orders.models import Order
+from orders.state_machine import ADMIN_STATUSES, ADMIN_TRANSITIONS, transition
 from meals.models import Meal
 from .models import PlatformSettings
+from .cache import get_cached_settings, invalidate_platform_settings
 from .forms import PlatformSettingsForm
 from .decorators import admin_required, can_edit_user, can_delete_user, can_manage_restaurant, can_manage_meal, can_view_order
 
@@ -129,21 +131,18 @@ def update_order_status(request, order_id):
         return JsonResponse({'success': False, 'error': 'Admin access required'})
     
     try:
-        order = get_object_or_404(Order, id=order_id)
         data = json.loads(request.body)
         
         new_status = data.get('status')
-        valid_statuses = ['pending', 'confirmed', 'preparing', 'ready', 'delivered', 'cancelled']
         
-        if new_status not in valid_statuses:
+        if new_status not in ADMIN_STATUSES:
             return JsonResponse({'success': False, 'error': 'Invalid status'})
         
-        order.status = new_status
-        order.save()
+        transition(order_id, new_status, ADMIN_TRANSITIONS)
         
         return JsonResponse({
             'success': True,
-            'status': order.status,
+            'status': new_status,
             'message': f'Order status updated to {new_status}'
         })
     except Exception as e:
@@ -197,14 +196,19 @@ def edit_order(request, order_id):
             # POST request - update order
             data = json.loads(request.body)
             
-            # Update order fields (only fields that exist in the model)
-            if 'total_amount' in data:
-                order.total_amount = data['total_amount']
-            if 'status' in data:
-                order.status = data['status']
-            
-            order.save()
-            
+            status_changed = 'status' in data and data['status'] != order.status
+            if status_changed and data['status'] not in ADMIN_STATUSES:
+                return JsonResponse({'success': False, 'error': 'Invalid status'})
+
+            with transaction.atomic():
+                # Update order fields (only fields that exist in the model)
+                if 'total_amount' in data:
+                    order.total_amount = data['total_amount']
+                    order.save(update_fields=['total_amount'])
+                # Status changes go through the state machine so they are recorded and announced
+                if status_changed:
+                    transition(order.id, data['status'], ADMIN_TRANSITIONS)
+
             return JsonResponse({
                 'success': True,
                 'message': 'Order updated successfully'
@@ -566,6 +570,8 @@ def update_site_info(request):
         
         # Update site information (you can add a SiteInfo model later)
         # For now, just return success
+        invalidate_platform_settings()
+        
         return JsonResponse({
             'success': True,
             'message': 'Site information updated successfully'
@@ -671,7 +677,7 @@ def get_platform_settings(request):
         return JsonResponse({'success': False, 'error': 'Admin access required'})
     
     try:
-        settings = PlatformSettings.get_settings()
+        settings = get_cached_settings()
         return JsonResponse({
             'success': True,
             'settings': {
@@ -0,0 +1,67 @@
+"""Helpers shared by the benchmark scripts.
+
+Run a benchmark from the project root, e.g. ``python -m benchmarks.settings_context``.
+Each one creates a throwaway test database, fills it, measures and drops it
+again, so the configured database's data is never touched.
+"""
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import django
+
+# tracemalloc slows every allocation down, so memory is sampled over fewer calls
+MEMORY_SAMPLES = 200
+
+
+def setup():
+    """Configure Django the way manage.py does"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Food_Ordering_Platform.settings')
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    """Run the block against a freshly created, migrated test database"""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def measure(func, number):
+    """Return func's mean wall time and mean peak allocation per call, in seconds and bytes"""
+    # Warm up caches, imports and compiled templates
+    func()
+
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    seconds = (time.perf_counter() - start) / number
+
+    samples = min(number, MEMORY_SAMPLES)
+    allocated = 0
+    tracemalloc.start()
+    for _ in range(samples):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        func()
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return seconds, allocated / samples
+
+
+def report(label, seconds, allocated=None):
+    """Print one benchmark result line"""
+    line = '{:<48} {:>10.1f} us/call'.format(label, seconds * 1e6)
+    if allocated is not None:
+        line += ' {:>10.1f} KiB/call'.format(allocated / 1024)
+    print(line)
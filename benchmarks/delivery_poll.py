@@ -0,0 +1,114 @@
+"""Benchmark the 50-order delivery poll and history payloads.
+
+Compares the endpoints as they were, loading Order instances and reading
+``o.user`` and ``o.restaurant`` per row, with the current views that join the
+names into one values_list() query and serialize straight from the tuples.
+The orders are spread over several customers and restaurants, so the per-row
+lookups cost a query each, as they do in production.
+
+    python -m benchmarks.delivery_poll [polls]
+"""
+import sys
+
+from benchmarks.common import measure, report, setup, test_database
+
+POLLS = 500
+CUSTOMERS = 10
+RESTAURANTS = 10
+
+
+def per_row_poll(request):
+    """delivery_orders_poll as it was: one query for the orders, two more per order"""
+    from django.http import JsonResponse
+
+    from orders.models import Order
+
+    orders = Order.objects.filter(status__in=['ready', 'picked_up', 'in_transit']).order_by('-created_at')[:50]
+    data = []
+    for o in orders:
+        data.append({
+            'id': o.id,
+            'status': o.status,
+            'total_amount': float(o.total_amount),
+            'created_at': o.created_at.isoformat(),
+            'user': getattr(o.user, 'username', None),
+            'restaurant': getattr(getattr(o, 'restaurant', None), 'name', None),
+        })
+    return JsonResponse({'success': True, 'orders': data})
+
+
+def per_row_history(request):
+    """delivery_history as it was: one query for the orders, two more per order"""
+    from django.http import JsonResponse
+
+    from orders.models import Order
+
+    orders = Order.objects.filter(status='delivered').order_by('-updated_at')[:50]
+    items = []
+    for o in orders:
+        items.append({
+            'id': o.id,
+            'user': getattr(o.user, 'username', None),
+            'restaurant': getattr(getattr(o, 'restaurant', None), 'name', None),
+            'total_amount': float(o.total_amount),
+            'updated_at': o.updated_at.isoformat(),
+        })
+    return JsonResponse({'success': True, 'orders': items})
+
+
+def seed():
+    """Create 180 board orders and 60 delivered ones; return a delivery user"""
+    from orders.models import Order
+    from restaurants.models import Restaurant
+    from users.models import User
+
+    driver = User.objects.create_user('driver', 'driver@example.com', 'pw', role='delivery')
+    owner = User.objects.create_user('owner', 'owner@example.com', 'pw', role='owner')
+    customers = [
+        User.objects.create_user(f'customer{i}', f'customer{i}@example.com', 'pw', role='customer')
+        for i in range(CUSTOMERS)
+    ]
+    restaurants = [Restaurant.objects.create(name=f'Kitchen {i}', owner=owner) for i in range(RESTAURANTS)]
+    statuses = ['ready', 'picked_up', 'in_transit', 'delivered']
+    Order.objects.bulk_create([
+        Order(user=customers[i % CUSTOMERS], restaurant=restaurants[i % RESTAURANTS],
+              status=statuses[i % len(statuses)], total_amount=10 + i % 7)
+        for i in range(240)
+    ])
+    return driver
+
+
+def count_queries(view, request):
+    from django.db import connection, reset_queries
+    from django.test.utils import CaptureQueriesContext
+
+    # A full query log stops growing, which would read as zero queries
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        view(request)
+    return len(queries)
+
+
+def main(polls):
+    from django.test import RequestFactory
+
+    from orders.views import delivery_history, delivery_orders_poll
+
+    driver = seed()
+    factory = RequestFactory()
+    cases = [
+        ('poll', '/orders/poll/', per_row_poll, delivery_orders_poll),
+        ('history', '/orders/history/', per_row_history, delivery_history),
+    ]
+    for name, path, before, after in cases:
+        request = factory.get(path)
+        request.user = driver
+        for label, view in [('per-row lookups', before), ('joined values_list', after)]:
+            queries = count_queries(view, request)
+            report(f'{name}, {label} ({queries} queries)', *measure(lambda: view(request), polls))
+
+
+if __name__ == '__main__':
+    setup()
+    with test_database():
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else POLLS)
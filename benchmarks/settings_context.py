@@ -0,0 +1,62 @@
+"""Benchmark the platform settings context processor.
+
+Compares building the 20-key settings payload on every render, as the
+processor used to, with reusing the payload built once per settings
+version. Both the processor alone and a full render of users/base.html,
+which every page extends, are measured.
+
+    python -m benchmarks.settings_context [renders]
+"""
+import sys
+
+from benchmarks.common import measure, report, setup, test_database
+
+RENDERS = 2000
+
+EAGER_PROCESSOR = 'benchmarks.settings_context.eager_platform_settings'
+PROCESSOR = 'admin_panel.context_processors.platform_settings'
+
+
+def eager_platform_settings(request):
+    """The processor as it was: a fresh payload for every render"""
+    from admin_panel.cache import get_cached_settings
+    from admin_panel.context_processors import _build_context
+
+    return _build_context(get_cached_settings())
+
+
+def templates_with(processor):
+    """Return the TEMPLATES setting with the settings processor swapped for processor"""
+    from django.conf import settings
+
+    templates = [dict(engine, OPTIONS=dict(engine['OPTIONS'])) for engine in settings.TEMPLATES]
+    for engine in templates:
+        engine['OPTIONS']['context_processors'] = [
+            processor if path == PROCESSOR else path for path in engine['OPTIONS']['context_processors']
+        ]
+    return templates
+
+
+def main(renders):
+    from django.contrib.auth.models import AnonymousUser
+    from django.template.loader import render_to_string
+    from django.test import RequestFactory, override_settings
+
+    from admin_panel.context_processors import platform_settings
+
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+
+    report('processor, payload per render', *measure(lambda: eager_platform_settings(request), renders))
+    report('processor, payload per settings version', *measure(lambda: platform_settings(request), renders))
+
+    for label, processor in [('payload per render', EAGER_PROCESSOR), ('payload per settings version', PROCESSOR)]:
+        with override_settings(TEMPLATES=templates_with(processor)):
+            report(f'users/base.html, {label}',
+                   *measure(lambda: render_to_string('users/base.html', request=request), renders))
+
+
+if __name__ == '__main__':
+    setup()
+    with test_database():
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else RENDERS)
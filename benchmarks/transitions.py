@@ -0,0 +1,129 @@
+"""Benchmark order status transitions under concurrent writers.
+
+Compares the views' old read-modify-write, loading the order and calling
+``order.save()``, with the state machine's compare-and-set UPDATE. Writer
+threads move orders confirmed -> preparing -> ready, either each on its own
+orders or all racing for the same ones. The contended runs also count how
+many moves each approach applied: every order can only really move twice,
+so anything above that is a lost update.
+
+SQLite lets one writer in at a time, so throughput there stays flat as
+writers are added; run against MySQL for numbers that mean something.
+
+    python -m benchmarks.transitions [orders per writer]
+"""
+import sys
+import threading
+import time
+
+from benchmarks.common import setup, test_database
+
+ORDERS_PER_WRITER = 50
+WRITERS = [1, 2, 4, 8]
+STEPS = ['preparing', 'ready']
+
+
+def save_transition(order_id, new_status):
+    """How the views moved orders before: read, check, save the whole row"""
+    from orders.models import Order
+    from orders.state_machine import RESTAURANT_TRANSITIONS, TransitionError
+
+    order = Order.objects.get(id=order_id)
+    if new_status not in RESTAURANT_TRANSITIONS.get(order.status, ()):
+        raise TransitionError(f'Invalid status transition from {order.status} to {new_status}')
+    order.status = new_status
+    order.save()
+
+
+def state_machine_transition(order_id, new_status):
+    from orders.state_machine import RESTAURANT_TRANSITIONS, transition
+
+    transition(order_id, new_status, RESTAURANT_TRANSITIONS)
+
+
+def seed(count):
+    """Create count confirmed orders and return their ids"""
+    from orders.models import Order
+    from restaurants.models import Restaurant
+    from users.models import User
+
+    owner = User.objects.create_user('owner', 'owner@example.com', 'pw', role='owner')
+    customer = User.objects.create_user('customer', 'customer@example.com', 'pw', role='customer')
+    restaurant = Restaurant.objects.create(name='Test Kitchen', owner=owner)
+    Order.objects.bulk_create([
+        Order(user=customer, restaurant=restaurant, status='confirmed', total_amount=10) for _ in range(count)
+    ])
+    return list(Order.objects.values_list('id', flat=True))
+
+
+def reset(order_ids):
+    from orders.models import Order, OrderStatusEvent
+
+    Order.objects.filter(id__in=order_ids).update(status='confirmed')
+    OrderStatusEvent.objects.all().delete()
+
+
+def run_writers(move, order_ids_per_writer):
+    """Run one thread per writer over its orders; return (seconds, moves applied)"""
+    from django.db import connection
+
+    from orders.state_machine import TransitionError
+
+    barrier = threading.Barrier(len(order_ids_per_writer) + 1)
+    applied = [0] * len(order_ids_per_writer)
+
+    def writer(index, order_ids):
+        try:
+            barrier.wait()
+            for order_id in order_ids:
+                for status in STEPS:
+                    try:
+                        move(order_id, status)
+                    except TransitionError:
+                        continue
+                    applied[index] += 1
+        finally:
+            # Each thread gets its own database connection; don't leak it
+            connection.close()
+
+    threads = [
+        threading.Thread(target=writer, args=(index, order_ids))
+        for index, order_ids in enumerate(order_ids_per_writer)
+    ]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, sum(applied)
+
+
+def main(orders_per_writer):
+    from orders.models import OrderStatusEvent
+
+    all_ids = seed(orders_per_writer * max(WRITERS))
+    shared_ids = all_ids[:orders_per_writer]
+    expected = len(shared_ids) * len(STEPS)
+
+    print('{:<40} {:>14} {:>10}'.format('', 'transitions/s', 'applied'))
+    for writers in WRITERS:
+        own_ids = [all_ids[i * orders_per_writer:(i + 1) * orders_per_writer] for i in range(writers)]
+        for label, move in [('save()', save_transition), ('compare-and-set', state_machine_transition)]:
+            for mode, ids in [('own orders', own_ids), ('same orders', [shared_ids] * writers)]:
+                reset(all_ids)
+                seconds, applied = run_writers(move, ids)
+                moves = applied if mode == 'own orders' else expected
+                line = '{:<40} {:>14.0f}'.format(f'{writers} writers, {mode}, {label}', moves / seconds)
+                if mode == 'same orders':
+                    line += f' {applied:>5}/{expected}'
+                print(line)
+                if move is state_machine_transition:
+                    # Every applied move must have written exactly one history row
+                    assert OrderStatusEvent.objects.count() == applied, 'history rows do not match transitions'
+
+
+if __name__ == '__main__':
+    setup()
+    with test_database():
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else ORDERS_PER_WRITER)
@@ -2,6 +2,9 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from .models import Meal
+from restaurants.kpis import invalidate_restaurant_kpis
+from admin_panel.cache import invalidate_public_pages
+from .sampling import invalidate_meal_id_pool
 
 # Register your models here.
 @admin.register(Meal)
@@ -41,13 +44,23 @@ class MealAdmin(admin.ModelAdmin):
     
     def make_available(self, request, queryset):
         """Bulk action to make meals available"""
+        restaurant_ids = set(queryset.values_list('restaurant_id', flat=True))
         updated = queryset.update(is_available=True)
+        # update() skips the meal_changed receiver
+        invalidate_meal_id_pool()
+        invalidate_public_pages()
+        invalidate_restaurant_kpis(*restaurant_ids)
         self.message_user(request, f'{updated} meals were successfully made available.')
     make_available.short_description = "Make selected meals available"
     
     def make_unavailable(self, request, queryset):
         """Bulk action to make meals unavailable"""
+        restaurant_ids = set(queryset.values_list('restaurant_id', flat=True))
         updated = queryset.update(is_available=False)
+        # update() skips the meal_changed receiver
+        invalidate_meal_id_pool()
+        invalidate_public_pages()
+        invalidate_restaurant_kpis(*restaurant_ids)
         self.message_user(request, f'{updated} meals were successfully made unavailable.')
     make_unavailable.short_description = "Make selected meals unavailable"
     
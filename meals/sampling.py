@@ -0,0 +1,60 @@
+import random
+import uuid
+
+from django.core.cache import cache
+
+from .models import Meal
+
+# IDs of every available meal, rebuilt when it expires or a meal changes. The
+# pool carries a version so shuffles cached for an older pool are never reused.
+MEAL_ID_POOL_KEY = 'meals:id_pool'
+MEAL_ID_POOL_TIMEOUT = 60 * 10
+
+# Seeds are drawn from a small fixed range so shuffled orderings are shared
+# between visitors and the number of cached orderings stays bounded
+SEED_COUNT = 256
+
+
+def get_meal_id_pool():
+    """Return the (version, meal IDs) pair for the cached pool of available meals"""
+    pool = cache.get(MEAL_ID_POOL_KEY)
+    if pool is None:
+        meal_ids = list(
+            Meal.objects.filter(is_available=True)
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+        pool = (uuid.uuid4().hex, meal_ids)
+        cache.set(MEAL_ID_POOL_KEY, pool, MEAL_ID_POOL_TIMEOUT)
+    return pool
+
+
+def invalidate_meal_id_pool():
+    """Drop the cached meal ID pool so the next listing rebuilds it"""
+    cache.delete(MEAL_ID_POOL_KEY)
+
+
+def new_seed():
+    """Pick a seed for a fresh random listing"""
+    return random.randrange(SEED_COUNT)
+
+
+def parse_seed(value):
+    """Return the seed carried in a query string, or None if it is missing or invalid"""
+    try:
+        seed = int(value)
+    except (TypeError, ValueError):
+        return None
+    return seed if 0 <= seed < SEED_COUNT else None
+
+
+def sample_meal_ids(seed):
+    """Return every available meal ID in a random order that is stable for the seed"""
+    version, meal_ids = get_meal_id_pool()
+    key = f'meals:shuffle:{version}:{seed}'
+    shuffled = cache.get(key)
+    if shuffled is None:
+        shuffled = list(meal_ids)
+        random.Random(seed).shuffle(shuffled)
+        cache.set(key, shuffled, MEAL_ID_POOL_TIMEOUT)
+    return shuffled
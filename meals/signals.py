@@ -0,0 +1,17 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from admin_panel.cache import invalidate_public_pages
+from restaurants.kpis import invalidate_restaurant_kpis
+from .models import Meal
+from .sampling import invalidate_meal_id_pool
+
+
+@receiver(post_save, sender=Meal)
+@receiver(post_delete, sender=Meal)
+def meal_changed(sender, instance, **kwargs):
+    """Keep the random listing pool, public pages and restaurant numbers in sync with the meals table"""
+    transaction.on_commit(invalidate_meal_id_pool)
+    transaction.on_commit(invalidate_public_pages)
+    transaction.on_commit(lambda: invalidate_restaurant_kpis(instance.restaurant_id))
@@ -0,0 +1,49 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from restaurants.models import Restaurant
+from users.models import User
+from .models import Favorite, Meal
+
+
+class MealListQueryTests(TestCase):
+    """meal_list loads a page of meals with their favorite flags in one query"""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'pw', role='owner')
+        cls.customer = User.objects.create_user('customer', 'customer@example.com', 'pw', role='customer')
+        cls.restaurant = Restaurant.objects.create(name='Test Kitchen', owner=owner)
+        cls.meals = [
+            Meal.objects.create(name=f'Meal {i}', description='Tasty', price=i + 1, restaurant=cls.restaurant)
+            for i in range(20)
+        ]
+        cls.favorites = {meal.id for meal in cls.meals[::2]}
+        Favorite.objects.bulk_create([Favorite(user=cls.customer, meal_id=meal_id) for meal_id in cls.favorites])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.customer)
+
+    def get_page(self, url, queries):
+        # The first request fills the settings, meal ID pool and cart badge caches
+        self.client.get(url)
+        with self.assertNumQueries(queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.context['meals']
+
+    def assert_favorites_flagged(self, page):
+        self.assertEqual(len(page.object_list), 6)
+        for meal in page.object_list:
+            self.assertEqual(meal.is_favorite, meal.id in self.favorites)
+
+    def test_random_listing(self):
+        # Session, user and the page of meals
+        page = self.get_page('/meals/?seed=7&page=2', 3)
+        self.assert_favorites_flagged(page)
+
+    def test_restaurant_listing(self):
+        # Session, user, restaurant, count and the page of meals
+        page = self.get_page(f'/meals/?restaurant={self.restaurant.id}&page=2', 5)
+        self.assert_favorites_flagged(page)
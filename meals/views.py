@@ -3,15 +3,29 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from django.core.paginator import Paginator
+from django.db.models import BooleanField, Exists, OuterRef, Value
 from django.views.decorators.http import require_http_methods
 from .models import Meal, Favorite
-from orders.models import Order, OrderItem
+from .sampling import new_seed, parse_seed, sample_meal_ids
+from orders.cart import get_cart
 from admin_panel.decorators import delivery_forbidden
+from admin_panel.cache import public_page_cache
 
 # Create your views here.
+@public_page_cache()
 def meal_list(request):
-    meals = Meal.objects.filter(is_available=True)
+    meals = Meal.objects.filter(is_available=True).select_related('restaurant')
     restaurant = None
+    seed = None
+    page_number = request.GET.get('page')
+    
+    # Flag the user's favorites in the same query that loads the page
+    if request.user.is_authenticated:
+        meals = meals.annotate(
+            is_favorite=Exists(Favorite.objects.filter(user=request.user, meal=OuterRef('pk')))
+        )
+    else:
+        meals = meals.annotate(is_favorite=Value(False, output_field=BooleanField()))
     
     # Filter by restaurant if specified
     restaurant_id = request.GET.get('restaurant')
@@ -22,30 +36,26 @@ def meal_list(request):
             meals = meals.filter(restaurant=restaurant)
         except Restaurant.DoesNotExist:
             pass
+        
+        # Pagination - 6 meals per page
+        paginator = Paginator(meals.order_by('id'), 6)
+        page_obj = paginator.get_page(page_number)
     else:
-        # If no restaurant filter, show random meals
-        meals = meals.order_by('?')
-    
-    # Add favorite status for authenticated users
-    if request.user.is_authenticated:
-        favorite_meal_ids = set(
-            Favorite.objects.filter(user=request.user, meal__in=meals)
-            .values_list('meal_id', flat=True)
-        )
-        for meal in meals:
-            meal.is_favorite = meal.id in favorite_meal_ids
-    else:
-        for meal in meals:
-            meal.is_favorite = False
-    
-    # Pagination - 6 meals per page
-    paginator = Paginator(meals, 6)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+        # If no restaurant filter, show random meals: shuffle the cached ID pool
+        # and only load the meals on the requested page. The seed travels with
+        # the page links so every page comes from the same ordering.
+        seed = parse_seed(request.GET.get('seed'))
+        if seed is None:
+            seed = new_seed()
+        paginator = Paginator(sample_meal_ids(seed), 6)
+        page_obj = paginator.get_page(page_number)
+        meals_by_id = meals.in_bulk(page_obj.object_list)
+        page_obj.object_list = [meals_by_id[meal_id] for meal_id in page_obj.object_list if meal_id in meals_by_id]
     
     context = {
         'meals': page_obj,
         'restaurant': restaurant,
+        'seed': seed,
         'page_obj': page_obj,
         'is_paginated': page_obj.has_other_pages(),
     }
@@ -83,27 +93,7 @@ def add_to_cart(request, meal_id):
             if quantity < 1 or quantity > 25:
                 return JsonResponse({'success': False, 'error': 'Quantity must be between 1 and 25.'})
             
-            # Get or create pending order for user
-            order, created = Order.objects.get_or_create(
-                user=request.user,
-                status='pending',
-                defaults={'restaurant': meal.restaurant, 'total_amount': 0}
-            )
-            
-            # Get or create order item
-            order_item, created = OrderItem.objects.get_or_create(
-                order=order,
-                meal=meal,
-                defaults={'quantity': quantity, 'price': meal.price}
-            )
-            
-            if not created:
-                order_item.quantity += quantity
-                order_item.save()
-            
-            # Update order total
-            order.total_amount = sum(item.total_price for item in order.items.all())
-            order.save()
+            get_cart(request).add(meal, quantity)
             
             return JsonResponse({'success': True, 'message': f'{meal.name} added to cart!'})
             
@@ -2,7 +2,8 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.db import models
-from .models import Order, OrderItem
+from .models import Order, OrderItem, OrderStatusEvent
+from .state_machine import ADMIN_TRANSITIONS, bulk_transition, record_status_events
 
 # Inline admin for order items
 class OrderItemInline(admin.TabularInline):
@@ -15,6 +16,18 @@ class OrderItemInline(admin.TabularInline):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('meal')
 
+# Read-only inline for an order's status history
+class OrderStatusEventInline(admin.TabularInline):
+    model = OrderStatusEvent
+    extra = 0
+    fields = ('from_status', 'to_status', 'created_at')
+    readonly_fields = ('from_status', 'to_status', 'created_at')
+    ordering = ('created_at',)
+    can_delete = False
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
 # Register your models here.
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
@@ -23,7 +36,7 @@ class OrderAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'restaurant__name', 'id')
     ordering = ('-created_at',)
     list_per_page = 25
-    inlines = [OrderItemInline]
+    inlines = [OrderItemInline, OrderStatusEventInline]
     
     fieldsets = (
         ('Order Information', {
@@ -45,21 +58,27 @@ class OrderAdmin(admin.ModelAdmin):
     
     actions = ['mark_confirmed', 'mark_delivered', 'mark_cancelled']
     
+    def save_model(self, request, obj, form, change):
+        """Save the order and record a status change made from the form"""
+        super().save_model(request, obj, form, change)
+        if not change or 'status' in form.changed_data:
+            record_status_events([(obj.id, form.initial.get('status') if change else '')], obj.status)
+    
     def mark_confirmed(self, request, queryset):
         """Bulk action to mark orders as confirmed"""
-        updated = queryset.update(status='confirmed')
+        updated = bulk_transition(queryset, 'confirmed', ADMIN_TRANSITIONS)
         self.message_user(request, f'{updated} orders were successfully marked as confirmed.')
     mark_confirmed.short_description = "Mark selected orders as confirmed"
     
     def mark_delivered(self, request, queryset):
         """Bulk action to mark orders as delivered"""
-        updated = queryset.update(status='delivered')
+        updated = bulk_transition(queryset, 'delivered', ADMIN_TRANSITIONS)
         self.message_user(request, f'{updated} orders were successfully marked as delivered.')
     mark_delivered.short_description = "Mark selected orders as delivered"
     
     def mark_cancelled(self, request, queryset):
         """Bulk action to mark orders as cancelled"""
-        updated = queryset.update(status='cancelled')
+        updated = bulk_transition(queryset, 'cancelled', ADMIN_TRANSITIONS)
         self.message_user(request, f'{updated} orders were successfully marked as cancelled.')
     mark_cancelled.short_description = "Mark selected orders as cancelled"
 
@@ -0,0 +1,22 @@
+from admin_panel.cache import get_version, bump_version
+
+# Statuses shown on the delivery order board
+BOARD_STATUSES = ['ready', 'picked_up', 'in_transit']
+
+# Version stamp of the delivery order board. It changes whenever an order
+# outside the cart changes, so pollers can tell "nothing new" without a query.
+BOARD_VERSION_KEY = 'orders:board_version'
+
+# Under a per-process cache a worker that missed a change answers polls with
+# 304 until its stamp expires, so keep that within one dashboard poll interval
+BOARD_VERSION_TIMEOUT = 15
+
+
+def get_board_version():
+    """Return the current order board version stamp"""
+    return get_version(BOARD_VERSION_KEY, BOARD_VERSION_TIMEOUT)
+
+
+def bump_board_version():
+    """Publish a new board version so pollers refetch"""
+    bump_version(BOARD_VERSION_KEY, BOARD_VERSION_TIMEOUT)
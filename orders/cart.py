@@ -0,0 +1,365 @@
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value, Window
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from meals.models import Meal
+from restaurants.kpis import invalidate_restaurant_kpis
+from .board import bump_board_version
+from .models import Order, OrderItem
+from .state_machine import record_status_events
+
+# Session key the session cart is stored under
+SESSION_CART_KEY = 'cart'
+
+# Cached number of lines in a user's cart, shown on the navigation badge
+CART_COUNT_CACHE_KEY = 'orders:cart_count:{user_id}'
+CART_COUNT_TIMEOUT = 60 * 5
+
+
+class CartItemNotFound(Exception):
+    """Raised when a cart line doesn't exist or isn't in the user's cart"""
+
+    def __init__(self, message='Item not found in your cart'):
+        super().__init__(message)
+
+
+def update_order_total(order_id):
+    """Recompute an order's total from its items with one UPDATE and return it.
+
+    The sum is worked out by the database inside the UPDATE, so call this in
+    the same transaction as the item change and the total can't drift from
+    the items.
+    """
+    items_total = OrderItem.objects.filter(order=OuterRef('pk')).values('order').annotate(
+        total=Sum(F('price') * F('quantity'))
+    ).values('total')
+    Order.objects.filter(id=order_id).update(
+        total_amount=Coalesce(
+            Subquery(items_total), Value(Decimal('0')),
+            output_field=DecimalField(max_digits=10, decimal_places=2)
+        )
+    )
+    return Order.objects.filter(id=order_id).values_list('total_amount', flat=True).first()
+
+
+class CartLine:
+    """A cart line shaped like an OrderItem for the cart templates"""
+
+    def __init__(self, id, meal, quantity, price):
+        self.id = id
+        self.meal = meal
+        self.quantity = quantity
+        self.price = price
+
+    @property
+    def total_price(self):
+        return self.price * self.quantity
+
+
+class BaseCart:
+    """Interface for where a user's cart lives until checkout.
+
+    Set ``ORDER_CART_BACKEND`` to the dotted path of a subclass to choose the
+    storage. Line ids are whatever the backend uses to address a line and are
+    only meaningful to the same backend.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.user = request.user
+
+    def add(self, meal, quantity):
+        """Add quantity of meal, priced at the meal's current price"""
+        raise NotImplementedError
+
+    def update(self, item_id, quantity):
+        """Set a line's quantity and return (line total, cart subtotal)"""
+        raise NotImplementedError
+
+    def remove(self, item_id):
+        raise NotImplementedError
+
+    def items(self):
+        """Return the cart lines with their meals and restaurants loaded"""
+        raise NotImplementedError
+
+    def contents(self):
+        """Return the cart lines and the cart total"""
+        lines = self.items()
+        return lines, sum((line.total_price for line in lines), Decimal('0'))
+
+    def count(self):
+        """Return the number of lines in the cart"""
+        raise NotImplementedError
+
+    def badge_count(self):
+        """Return count() for the navigation badge, from the cache when possible"""
+        key = CART_COUNT_CACHE_KEY.format(user_id=self.user.id)
+        count = cache.get(key)
+        if count is None:
+            count = self.count()
+            cache.set(key, count, CART_COUNT_TIMEOUT)
+        return count
+
+    def count_changed(self, count=None):
+        """Store the new line count after a change, or drop it to be recounted"""
+        key = CART_COUNT_CACHE_KEY.format(user_id=self.user.id)
+        if count is None:
+            cache.delete(key)
+        else:
+            cache.set(key, count, CART_COUNT_TIMEOUT)
+
+    def checkout(self, token=None):
+        """Place the cart as one order per restaurant and empty it; returns the orders.
+
+        ``token`` is the checkout's idempotency key. Repeating a checkout with
+        the same token returns the orders it placed instead of placing more.
+        """
+        raise NotImplementedError
+
+
+class DatabaseCart(BaseCart):
+    """Cart kept as the user's pending Order and its OrderItems"""
+
+    def _lines(self):
+        return OrderItem.objects.filter(order__user=self.user, order__status='pending')
+
+    def _increment(self, order, meal, quantity):
+        return OrderItem.objects.filter(order=order, meal=meal).update(
+            quantity=F('quantity') + quantity, updated_at=timezone.now()
+        )
+
+    def add(self, meal, quantity):
+        # Get or create pending order for user. The one-cart-per-user constraint
+        # makes a concurrent duplicate fail, and get_or_create then fetches the winner.
+        # Done before the transaction so that fetch sees the other request's commit.
+        order, created = Order.objects.get_or_create(
+            user=self.user,
+            status='pending',
+            defaults={'restaurant': meal.restaurant, 'total_amount': 0}
+        )
+
+        with transaction.atomic():
+            # Bump the quantity in the database so concurrent adds can't overwrite each other
+            if not self._increment(order, meal, quantity):
+                try:
+                    with transaction.atomic():
+                        OrderItem.objects.create(order=order, meal=meal, quantity=quantity, price=meal.price)
+                except IntegrityError:
+                    # Another request added the same meal first
+                    self._increment(order, meal, quantity)
+
+            update_order_total(order.id)
+        self.count_changed()
+
+    def _lock_cart(self):
+        """Lock the user's cart row for the rest of the transaction and return its id.
+
+        checkout() takes the same lock, so a line read after this can't be
+        moved onto a placed order before the transaction ends.
+        """
+        return Order.objects.select_for_update().filter(
+            user=self.user, status='pending'
+        ).values_list('id', flat=True).first()
+
+    def update(self, item_id, quantity):
+        with transaction.atomic():
+            order_id = self._lock_cart()
+            price = OrderItem.objects.filter(id=item_id, order_id=order_id).values_list('price', flat=True).first()
+            if order_id is None or price is None:
+                raise CartItemNotFound()
+
+            OrderItem.objects.filter(id=item_id).update(quantity=quantity, updated_at=timezone.now())
+            subtotal = update_order_total(order_id)
+        return price * quantity, subtotal
+
+    def remove(self, item_id):
+        with transaction.atomic():
+            order_id = self._lock_cart()
+            if order_id is None or not OrderItem.objects.filter(id=item_id, order_id=order_id).delete()[0]:
+                raise CartItemNotFound()
+
+            update_order_total(order_id)
+        self.count_changed()
+
+    def items(self):
+        return list(self._lines().select_related('meal__restaurant'))
+
+    def contents(self):
+        # The database totals the cart over the same rows, in the same query
+        lines = list(self._lines().select_related('meal__restaurant').annotate(
+            cart_total=Window(Sum(F('price') * F('quantity')))
+        ))
+        return lines, lines[0].cart_total if lines else Decimal('0')
+
+    def count(self):
+        return self._lines().count()
+
+    def checkout(self, token=None):
+        with transaction.atomic():
+            # Lock the cart so a concurrent checkout or edit of it waits for this one
+            cart_id = self._lock_cart()
+
+            # A resubmission waited on the lock above until the first one finished
+            placed = get_checkout_orders(self.user, token)
+            if placed or cart_id is None:
+                return placed
+
+            lines = list(OrderItem.objects.filter(order_id=cart_id).values_list(
+                'id', 'meal__restaurant_id', 'price', 'quantity'
+            ))
+            if not lines:
+                return []
+
+            orders = place_orders(
+                self.user, [(restaurant_id, price, quantity) for _, restaurant_id, price, quantity in lines],
+                token
+            )
+
+            # Move the lines, already priced, onto their restaurant's order
+            OrderItem.objects.bulk_update([
+                OrderItem(id=item_id, order=orders[restaurant_id])
+                for item_id, restaurant_id, _, _ in lines
+            ], ['order'])
+            Order.objects.filter(id=cart_id).update(total_amount=0)
+
+        self.count_changed(0)
+        return list(orders.values())
+
+
+class SessionCart(BaseCart):
+    """Cart kept in the user's session until checkout.
+
+    Browsing and editing the cart writes nothing to the orders tables; the
+    Order and its OrderItems are only created by checkout(). The session holds
+    ``{meal_id: [quantity, price]}``, so pair it with a cache-backed
+    SESSION_ENGINE to keep carts off the database entirely. Edits from two tabs
+    at once are last-write-wins, like any other session data.
+    """
+
+    def _data(self):
+        return self.request.session.get(SESSION_CART_KEY, {})
+
+    def _save(self, data):
+        self.request.session[SESSION_CART_KEY] = data
+
+    def add(self, meal, quantity):
+        data = self._data()
+        key = str(meal.id)
+        if key in data:
+            data[key][0] += quantity
+        else:
+            data[key] = [quantity, str(meal.price)]
+        self._save(data)
+
+    def update(self, item_id, quantity):
+        data = self._data()
+        key = str(item_id)
+        if key not in data:
+            raise CartItemNotFound()
+        data[key][0] = quantity
+        self._save(data)
+
+        subtotal = sum(Decimal(price) * qty for qty, price in data.values())
+        return Decimal(data[key][1]) * quantity, subtotal
+
+    def remove(self, item_id):
+        data = self._data()
+        if data.pop(str(item_id), None) is None:
+            raise CartItemNotFound()
+        self._save(data)
+
+    def items(self):
+        data = self._data()
+        meals = Meal.objects.select_related('restaurant').in_bulk([int(key) for key in data])
+        lines = []
+        for key, (quantity, price) in data.items():
+            meal = meals.get(int(key))
+            # Meals deleted since they were added simply drop out of the cart
+            if meal is not None:
+                lines.append(CartLine(meal.id, meal, quantity, Decimal(price)))
+        return lines
+
+    def count(self):
+        return len(self._data())
+
+    def badge_count(self):
+        # The session is loaded for the request anyway, so there is nothing to cache
+        return self.count()
+
+    def checkout(self, token=None):
+        lines = self.items()
+        if not lines:
+            return get_checkout_orders(self.user, token)
+
+        try:
+            with transaction.atomic():
+                orders = place_orders(
+                    self.user, [(line.meal.restaurant_id, line.price, line.quantity) for line in lines],
+                    token
+                )
+                OrderItem.objects.bulk_create([
+                    OrderItem(order=orders[line.meal.restaurant_id], meal=line.meal,
+                              quantity=line.quantity, price=line.price)
+                    for line in lines
+                ])
+        except IntegrityError:
+            # A concurrent submission with the same token placed the orders first
+            placed = get_checkout_orders(self.user, token)
+            if not placed:
+                raise
+            return placed
+
+        self._save({})
+        return list(orders.values())
+
+
+def get_checkout_orders(user, token):
+    """Return the orders a checkout placed for user, oldest first"""
+    if token is None:
+        return []
+    return list(Order.objects.filter(user=user, checkout_token=token).order_by('id'))
+
+
+def place_orders(user, lines, token=None):
+    """Create one confirmed order per restaurant for a checkout.
+
+    ``lines`` is a list of (restaurant_id, price, quantity). The orders are
+    written with one bulk INSERT and their history with another, so the cost
+    doesn't grow with the size of the cart. ``token`` is the checkout's
+    idempotency key. Returns {restaurant_id: order}.
+    """
+    totals = {}
+    for restaurant_id, price, quantity in lines:
+        totals[restaurant_id] = totals.get(restaurant_id, 0) + price * quantity
+
+    token = token or uuid.uuid4()
+    orders = Order.objects.bulk_create([
+        Order(user=user, restaurant_id=restaurant_id, status='confirmed',
+              total_amount=total, checkout_token=token)
+        for restaurant_id, total in totals.items()
+    ])
+    if orders[0].pk is None:
+        # MySQL can't return ids from a bulk insert; find them by the shared token
+        ids = dict(Order.objects.filter(checkout_token=token).values_list('restaurant_id', 'id'))
+        for order in orders:
+            order.pk = ids[order.restaurant_id]
+
+    record_status_events([(order.id, 'pending') for order in orders], 'confirmed')
+    # The bulk insert skips the post_save signal that would do these
+    transaction.on_commit(bump_board_version)
+    transaction.on_commit(lambda: invalidate_restaurant_kpis(*totals))
+    return {order.restaurant_id: order for order in orders}
+
+
+def get_cart(request):
+    """Return the request user's cart from the backend configured by ORDER_CART_BACKEND"""
+    path = getattr(settings, 'ORDER_CART_BACKEND', 'orders.cart.DatabaseCart')
+    return import_string(path)(request)
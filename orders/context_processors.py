@@ -0,0 +1,10 @@
+from .cart import get_cart
+
+
+def cart(request):
+    """Add the cart badge count to all templates"""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated or user.role not in ['customer', 'owner', 'admin']:
+        return {}
+    # Passed uncalled so only templates that show the badge look it up
+    return {'cart_count': get_cart(request).badge_count}
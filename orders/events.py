@@ -0,0 +1,235 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .board import BOARD_STATUSES, bump_board_version
+from .models import Order
+
+# Channel every delivery driver's board stream listens on
+BOARD_CHANNEL = 'orders:board'
+
+# Channel a single order's tracking streams listen on
+ORDER_CHANNEL = 'orders:order:{order_id}'
+
+# Seconds between heartbeat comments on an idle stream, so proxies keep it open
+# and dead connections are noticed
+HEARTBEAT_SECONDS = 15
+
+# Messages a slow subscriber may have queued before new ones are dropped
+SUBSCRIPTION_QUEUE_SIZE = 100
+
+# Streams one process keeps open at once, in total and per user
+MAX_STREAMS = 2000
+MAX_STREAMS_PER_USER = 5
+
+
+class Subscription:
+    """A single stream's view of a broker channel, read from its event loop"""
+
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=SUBSCRIPTION_QUEUE_SIZE)
+
+    def deliver(self, message):
+        """Hand a message to the subscriber; safe to call from any thread"""
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # The subscriber's loop is gone; it will be unsubscribed on close
+            pass
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Drop messages for a stalled client rather than buffer without bound
+            pass
+
+    async def get(self, timeout):
+        """Wait for the next message, raising asyncio.TimeoutError when idle"""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class BaseBroker:
+    """Interface for delivering order events to open streams.
+
+    Set ``ORDER_EVENTS_BROKER`` to the dotted path of a subclass to use a
+    shared broker (e.g. Redis pub/sub) when running several worker processes.
+    """
+
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+
+class LocalBroker(BaseBroker):
+    """In-memory broker that reaches subscribers in the current process only"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(message)
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Return the process-wide broker configured by ORDER_EVENTS_BROKER"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'ORDER_EVENTS_BROKER', 'orders.events.LocalBroker')
+                _broker = import_string(path)()
+    return _broker
+
+
+def publish_order_status(order_id, status, from_status=None):
+    """Announce an order's status change to its trackers and the board once committed"""
+    message = {
+        'event': 'order_status',
+        'order_id': order_id,
+        'status': status,
+        'status_display': dict(Order.STATUS_CHOICES).get(status, status),
+    }
+    # Only orders moving onto, within or off the board change what drivers see
+    on_board = status in BOARD_STATUSES or from_status in BOARD_STATUSES
+
+    def publish():
+        # Status changes made with queryset updates skip the model signals, so
+        # move the board version on here as well
+        bump_board_version()
+        broker = get_broker()
+        if on_board:
+            broker.publish(BOARD_CHANNEL, dict(message, order=get_board_order(order_id, status)))
+        broker.publish(ORDER_CHANNEL.format(order_id=order_id), message)
+
+    transaction.on_commit(publish)
+
+
+def get_board_order(order_id, status):
+    """Return the fields the board shows for an order card, or None if it isn't on the board"""
+    if status not in BOARD_STATUSES:
+        return None
+    row = Order.objects.filter(id=order_id).values_list(
+        'user__username', 'restaurant__name', 'total_amount', 'created_at'
+    ).first()
+    if row is None:
+        return None
+    username, restaurant_name, total_amount, created_at = row
+    return {
+        'user': username,
+        'restaurant': restaurant_name,
+        'total_amount': float(total_amount),
+        'created_at': timezone.localtime(created_at).strftime('%H:%M'),
+    }
+
+
+_streams_lock = threading.Lock()
+_open_streams = defaultdict(int)
+_open_streams_total = 0
+
+
+def _acquire_stream(user_id):
+    global _open_streams_total
+    with _streams_lock:
+        if _open_streams_total >= MAX_STREAMS or _open_streams.get(user_id, 0) >= MAX_STREAMS_PER_USER:
+            return False
+        _open_streams_total += 1
+        _open_streams[user_id] += 1
+        return True
+
+
+def _release_stream(user_id):
+    global _open_streams_total
+    with _streams_lock:
+        _open_streams_total -= 1
+        _open_streams[user_id] -= 1
+        if not _open_streams[user_id]:
+            del _open_streams[user_id]
+
+
+class EventStream:
+    """Server-Sent Events body for one subscription.
+
+    Django calls close() once the response is finished or the client goes
+    away, which frees the subscription and the user's stream slot.
+    """
+
+    def __init__(self, subscription, user_id):
+        self.subscription = subscription
+        self.user_id = user_id
+        self.closed = False
+
+    def __aiter__(self):
+        return self._events()
+
+    async def _events(self):
+        # Ask the browser to wait a few seconds before reconnecting
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                message = await self.subscription.get(HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': heartbeat\n\n'
+                continue
+            yield 'event: {}\ndata: {}\n\n'.format(message['event'], json.dumps(message))
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.subscription.close()
+            _release_stream(self.user_id)
+
+
+def event_stream_response(channel, user_id):
+    """Build a Server-Sent Events response streaming a broker channel to a user"""
+    if not _acquire_stream(user_id):
+        response = JsonResponse({'success': False, 'error': 'Too many open streams'}, status=503)
+        response['Retry-After'] = str(HEARTBEAT_SECONDS)
+        return response
+
+    subscription = get_broker().subscribe(channel)
+    response = StreamingHttpResponse(EventStream(subscription, user_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
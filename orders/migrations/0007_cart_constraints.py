@@ -0,0 +1,70 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:31
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_duplicate_carts(apps, schema_editor):
+    """Fold duplicate pending carts and repeated cart lines together before the constraints land"""
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    merged = set()
+
+    # Placed orders are history: a repeated line can only be folded together
+    # when every copy has the same price, so the order's total doesn't change
+    duplicate_lines = OrderItem.objects.values('order', 'meal').annotate(
+        lines=Count('id'), prices=Count('price', distinct=True)
+    ).filter(lines__gt=1)
+    conflicts = sorted(set(
+        duplicate_lines.exclude(order__status='pending').filter(prices__gt=1).values_list('order', flat=True)
+    ))
+    if conflicts:
+        raise RuntimeError(
+            'Orders {} repeat a meal on lines with different prices; merge those lines by hand '
+            'before applying orders.0007'.format(', '.join(str(order_id) for order_id in conflicts))
+        )
+
+    duplicate_users = Order.objects.filter(status='pending').values('user').annotate(
+        carts=Count('id')
+    ).filter(carts__gt=1).values_list('user', flat=True)
+    for user_id in duplicate_users:
+        cart, *extra = Order.objects.filter(user_id=user_id, status='pending').order_by('created_at', 'id')
+        OrderItem.objects.filter(order__in=extra).update(order=cart)
+        Order.objects.filter(id__in=[order.id for order in extra]).delete()
+        merged.add(cart.id)
+
+    for order_id, meal_id, status in duplicate_lines.values_list('order', 'meal', 'order__status'):
+        item, *extra = OrderItem.objects.filter(order_id=order_id, meal_id=meal_id).order_by('id')
+        item.quantity += sum(line.quantity for line in extra)
+        item.save()
+        OrderItem.objects.filter(id__in=[line.id for line in extra]).delete()
+        if status == 'pending':
+            merged.add(order_id)
+
+    # Only carts are re-totalled; a placed order keeps the total it was charged
+    for order in Order.objects.filter(id__in=merged):
+        order.total_amount = sum(item.price * item.quantity for item in OrderItem.objects.filter(order=order))
+        order.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meals', '0005_meal_prep_time_max_meal_prep_time_min'),
+        ('orders', '0006_orderstatusevent'),
+        ('restaurants', '0006_restaurant_overall_rating'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_carts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='order',
+            constraint=models.UniqueConstraint(models.Case(models.When(status='pending', then=models.F('user'))), name='order_one_pending_cart_per_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='orderitem',
+            constraint=models.UniqueConstraint(fields=('order', 'meal'), name='orderitem_order_meal_unique'),
+        ),
+    ]
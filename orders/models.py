@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from restaurants.models import Restaurant
 from meals.models import Meal
 
@@ -22,13 +23,59 @@ class Order(models.Model):
     restaurant = models.ForeignKey(Restaurant, on_delete=models.SET_NULL, null=True, related_name='orders')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    # Idempotency key of the checkout that placed the order; shared by the
+    # orders one checkout placed, one per restaurant in the cart
+    checkout_token = models.UUIDField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Delivery board and polling: orders in a status, newest first
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+            # Delivery history and stats: orders that reached a status, by last change
+            models.Index(fields=['status', 'updated_at'], name='order_status_updated_idx'),
+            # Cart lookups: a user's pending order
+            models.Index(fields=['user', 'status'], name='order_user_status_idx'),
+            # Restaurant dashboards: a restaurant's orders, newest first
+            models.Index(fields=['restaurant', 'created_at'], name='order_restaurant_created_idx'),
+        ]
+        constraints = [
+            # One pending cart per user. Indexing user only while pending (NULL
+            # otherwise) keeps it enforceable on MySQL, which has no partial indexes.
+            models.UniqueConstraint(
+                models.Case(models.When(status='pending', then=models.F('user'))),
+                name='order_one_pending_cart_per_user',
+            ),
+            # A resubmitted checkout can't place the same restaurant's order twice
+            models.UniqueConstraint(
+                fields=['checkout_token', 'restaurant'], name='order_checkout_token_unique'
+            ),
+        ]
+    
     def __str__(self):
         return f"Order {self.id} - {self.user.username}"
 
 
+class OrderStatusEvent(models.Model):
+    """Append-only record of an order moving from one status to another"""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='status_events')
+    from_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES, blank=True)
+    to_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        indexes = [
+            # Tracking pages: an order's timeline in order
+            models.Index(fields=['order', 'created_at'], name='order_event_order_created_idx'),
+            # Analytics: orders that reached a status in a time window
+            models.Index(fields=['to_status', 'created_at', 'order'], name='order_event_status_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Order {self.order_id}: {self.from_status or '-'} → {self.to_status}"
+
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
     meal = models.ForeignKey(Meal, on_delete=models.CASCADE)
@@ -37,6 +84,12 @@ class OrderItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        constraints = [
+            # A meal appears once per order; adding it again bumps the quantity
+            models.UniqueConstraint(fields=['order', 'meal'], name='orderitem_order_meal_unique'),
+        ]
+    
     @property
     def total_price(self):
         return self.price * self.quantity
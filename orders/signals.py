@@ -0,0 +1,29 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from restaurants.kpis import invalidate_restaurant_kpis
+from .models import Order
+from .board import bump_board_version
+from .events import publish_order_status
+from .state_machine import order_status_changed
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def order_changed(sender, instance, **kwargs):
+    """Move the order board version on and drop the restaurant's cached numbers"""
+    # Pending carts never appear on the board
+    if instance.status != 'pending':
+        transaction.on_commit(bump_board_version)
+    transaction.on_commit(lambda: invalidate_restaurant_kpis(instance.restaurant_id))
+
+
+@receiver(order_status_changed, sender=Order)
+def order_status_transitioned(sender, order_id, from_status, to_status, **kwargs):
+    """Push a state machine transition to the board and the order's trackers"""
+    publish_order_status(order_id, to_status, from_status)
+    # Restaurant numbers only count orders that have left the cart
+    if 'pending' in (from_status, to_status):
+        restaurant_id = Order.objects.filter(id=order_id).values_list('restaurant_id', flat=True).first()
+        transaction.on_commit(lambda: invalidate_restaurant_kpis(restaurant_id))
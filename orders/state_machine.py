@@ -0,0 +1,128 @@
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Order, OrderStatusEvent
+
+# Status changes each role may make, keyed by the order's current status.
+# Pending orders are customers' carts; only checkout moves them on.
+RESTAURANT_TRANSITIONS = {
+    'confirmed': ['preparing', 'cancelled'],
+    'preparing': ['ready', 'cancelled'],
+}
+
+DELIVERY_TRANSITIONS = {
+    'ready': ['picked_up'],
+    'picked_up': ['in_transit', 'delivered'],
+    'in_transit': ['delivered'],
+}
+
+# Admins may override an order into any of these statuses from any status.
+# Pending means "in the customer's cart", so no order can be sent back to it.
+ADMIN_STATUSES = ['confirmed', 'preparing', 'ready', 'delivered', 'cancelled']
+ADMIN_TRANSITIONS = {status: ADMIN_STATUSES for status, _ in Order.STATUS_CHOICES}
+
+# How often to re-check the rules when another request changes the order first
+MAX_ATTEMPTS = 3
+
+# Sent after an order's status changes, with order_id, from_status, to_status
+# and changed_at
+order_status_changed = Signal()
+
+
+class TransitionError(Exception):
+    """Raised when an order can't move to the requested status"""
+
+    def __init__(self, message, current_status=None):
+        super().__init__(message)
+        self.current_status = current_status
+
+
+def get_status_display(status):
+    """Return the human readable label for a status"""
+    return dict(Order.STATUS_CHOICES).get(status, status)
+
+
+def transition(order_id, new_status, transitions, queryset=None):
+    """Move an order to new_status if the transition rules allow it.
+
+    The change is a compare-and-set: one UPDATE touching only status and
+    updated_at that matches only while the order still has the status the
+    rules were checked against, committed together with its history row. If
+    another request got there first the rules are checked again against the
+    new status. Moving an order to the status it already has is refused.
+    ``queryset`` limits which orders the caller may see (e.g. a restaurant
+    owner's). Returns the old status; raises Order.DoesNotExist or
+    TransitionError.
+    """
+    orders = queryset if queryset is not None else Order.objects.all()
+    for _ in range(MAX_ATTEMPTS):
+        current_status = orders.filter(id=order_id).values_list('status', flat=True).first()
+        if current_status is None:
+            raise Order.DoesNotExist(f'Order {order_id} not found')
+        if new_status == current_status:
+            raise TransitionError(f'Order is already {current_status}', current_status)
+        if new_status not in transitions.get(current_status, ()):
+            raise TransitionError(
+                f'Invalid status transition from {current_status} to {new_status}', current_status
+            )
+
+        changed_at = timezone.now()
+        with transaction.atomic():
+            updated = Order.objects.filter(id=order_id, status=current_status).update(
+                status=new_status, updated_at=changed_at
+            )
+            if updated:
+                record_status_events([(order_id, current_status)], new_status, changed_at)
+        if updated:
+            order_status_changed.send(
+                sender=Order, order_id=order_id, from_status=current_status,
+                to_status=new_status, changed_at=changed_at
+            )
+            return current_status
+
+    raise TransitionError('Order is being updated by someone else, please try again', current_status)
+
+
+def bulk_transition(queryset, new_status, transitions):
+    """Move every order in queryset the rules allow to new_status.
+
+    The orders are locked and moved with one UPDATE and their history written
+    with one bulk INSERT. Orders the rules don't allow are left alone. Returns
+    the number of orders moved.
+    """
+    allowed_from = [
+        status for status, targets in transitions.items() if new_status in targets and status != new_status
+    ]
+    changed_at = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            queryset.filter(status__in=allowed_from).select_for_update().values_list('id', 'status')
+        )
+        if not rows:
+            return 0
+        Order.objects.filter(id__in=[order_id for order_id, _ in rows]).update(
+            status=new_status, updated_at=changed_at
+        )
+        record_status_events(rows, new_status, changed_at)
+
+    for order_id, from_status in rows:
+        order_status_changed.send(
+            sender=Order, order_id=order_id, from_status=from_status,
+            to_status=new_status, changed_at=changed_at
+        )
+    return len(rows)
+
+
+def record_status_events(rows, to_status, changed_at=None):
+    """Append history rows for orders moved to to_status.
+
+    ``rows`` is an iterable of (order_id, from_status) pairs; they are written
+    with a single bulk INSERT.
+    """
+    changed_at = changed_at or timezone.now()
+    OrderStatusEvent.objects.bulk_create([
+        OrderStatusEvent(order_id=order_id, from_status=from_status or '',
+                         to_status=to_status, created_at=changed_at)
+        for order_id, from_status in rows
+    ])
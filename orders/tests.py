@@ -0,0 +1,387 @@
+import threading
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from meals.models import Meal
+from restaurants.models import Restaurant
+from users.models import User
+from .board import BOARD_STATUSES
+from .cart import SESSION_CART_KEY
+from .models import Order, OrderItem, OrderStatusEvent
+from .views import _compute_delivery_stats
+
+# Requests fired at once by the concurrency tests
+CONCURRENT_REQUESTS = 8
+
+
+def run_concurrently(calls):
+    """Run each callable in its own thread, released together, and return their results"""
+    barrier = threading.Barrier(len(calls))
+    results = [None] * len(calls)
+
+    def worker(index, call):
+        try:
+            barrier.wait()
+            results[index] = call()
+        finally:
+            # Each thread gets its own database connection; don't leak it
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(index, call)) for index, call in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def logged_in_client(user):
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+class DeliveryAcceptRaceTests(TransactionTestCase):
+    """Concurrent drivers accepting the same order"""
+
+    def setUp(self):
+        cache.clear()
+        owner = User.objects.create_user('owner', 'owner@example.com', 'pw', role='owner')
+        customer = User.objects.create_user('customer', 'customer@example.com', 'pw', role='customer')
+        restaurant = Restaurant.objects.create(name='Race Kitchen', owner=owner)
+        self.order = Order.objects.create(user=customer, restaurant=restaurant, status='ready', total_amount=10)
+        self.drivers = [
+            User.objects.create_user(f'driver{i}', f'driver{i}@example.com', 'pw', role='delivery')
+            for i in range(CONCURRENT_REQUESTS)
+        ]
+
+    def test_exactly_one_driver_wins(self):
+        clients = [logged_in_client(driver) for driver in self.drivers]
+        url = f'/orders/accept/{self.order.id}/'
+
+        status_codes = run_concurrently([lambda client=client: client.post(url).status_code for client in clients])
+
+        self.assertEqual(sorted(status_codes), [200] + [409] * (CONCURRENT_REQUESTS - 1))
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'picked_up')
+        self.assertEqual(OrderStatusEvent.objects.filter(order=self.order, to_status='picked_up').count(), 1)
+
+
+@override_settings(ORDER_CART_BACKEND='orders.cart.DatabaseCart')
+class ConcurrentAddToCartTests(TransactionTestCase):
+    """Concurrent add-to-cart requests from one customer, e.g. a double click or two tabs"""
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            # Shared-cache in-memory SQLite locks whole tables, so concurrent
+            # writers fail at once instead of waiting for each other
+            self.skipTest('needs a file-backed test database (TEST NAME) on SQLite')
+        cache.clear()
+        owner = User.objects.create_user('owner', 'owner@example.com', 'pw', role='owner')
+        self.customer = User.objects.create_user('customer', 'customer@example.com', 'pw', role='customer')
+        restaurant = Restaurant.objects.create(name='Race Kitchen', owner=owner)
+        self.meal = Meal.objects.create(name='Soup', description='Hot', price=Decimal('4.50'), restaurant=restaurant)
+
+    def add_concurrently(self):
+        clients = [logged_in_client(self.customer) for _ in range(CONCURRENT_REQUESTS)]
+        url = f'/meals/add-to-cart/{self.meal.id}/'
+        return run_concurrently([
+            lambda client=client: client.post(url, {'quantity': 1}).json()['success'] for client in clients
+        ])
+
+    def assert_one_cart_holding(self, quantity):
+        cart = Order.objects.get(user=self.customer, status='pending')
+        line = OrderItem.objects.get(order=cart, meal=self.meal)
+        self.assertEqual(line.quantity, quantity)
+        self.assertEqual(cart.total_amount, self.meal.price * quantity)
+
+    def test_first_adds_create_one_cart_without_losing_increments(self):
+        self.assertEqual(self.add_concurrently(), [True] * CONCURRENT_REQUESTS)
+        self.assert_one_cart_holding(CONCURRENT_REQUESTS)
+
+    def test_adds_to_an_existing_line_are_not_lost(self):
+        cart = Order.objects.create(user=self.customer, restaurant=self.meal.restaurant, status='pending',
+                                    total_amount=self.meal.price)
+        OrderItem.objects.create(order=cart, meal=self.meal, quantity=1, price=self.meal.price)
+
+        self.assertEqual(self.add_concurrently(), [True] * CONCURRENT_REQUESTS)
+        self.assert_one_cart_holding(CONCURRENT_REQUESTS + 1)
+
+
+class OrderIndexUsageTests(TransactionTestCase):
+    """EXPLAIN the hot order queries and check each is served by its composite index.
+
+    The tables are filled with a realistic spread, mostly delivered history
+    and a handful of live orders, and analyzed where the backend keeps
+    distribution statistics, so the planner sees the data it would in
+    production rather than a tiny table it may as well scan.
+    """
+
+    # Every 20 orders: 17 delivered, 1 cancelled, 1 confirmed and 1 ready
+    STATUS_MIX = ['delivered'] * 17 + ['cancelled', 'confirmed', 'ready']
+
+    def setUp(self):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'pw', role='owner')
+        User.objects.bulk_create([User(username=f'customer{i}', role='customer') for i in range(50)])
+        Restaurant.objects.bulk_create([Restaurant(name=f'Kitchen {i}', owner=owner) for i in range(20)])
+        customers = list(User.objects.filter(role='customer'))
+        restaurants = list(Restaurant.objects.all())
+        self.customer = customers[0]
+        self.restaurant = restaurants[0]
+
+        Order.objects.bulk_create([
+            Order(user=customers[i % 50], restaurant=restaurants[i % 20],
+                  status=self.STATUS_MIX[i % len(self.STATUS_MIX)], total_amount=10)
+            for i in range(3000)
+        ] + [
+            Order(user=customer, restaurant=restaurants[0], status='pending', total_amount=0)
+            for customer in customers
+        ])
+        now = timezone.now()
+        OrderStatusEvent.objects.bulk_create([
+            OrderStatusEvent(order_id=order_id, from_status='in_transit', to_status='delivered',
+                             created_at=now - timedelta(days=index % 60))
+            for index, order_id in enumerate(Order.objects.filter(status='delivered').values_list('id', flat=True))
+        ])
+        self.order = Order.objects.filter(status='delivered').first()
+
+        # SQLite's ANALYZE only keeps an average row count per index value,
+        # which misjudges a skewed status column, so it keeps its defaults
+        tables = [Order._meta.db_table, OrderStatusEvent._meta.db_table]
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                cursor.execute('ANALYZE TABLE {}'.format(', '.join(tables)))
+            elif connection.vendor == 'postgresql':
+                cursor.execute('ANALYZE {}'.format(', '.join(tables)))
+
+    def assertUsesIndex(self, queryset, *index_names):
+        plan = queryset.explain()
+        self.assertTrue(any(name in plan for name in index_names), f'None of {index_names} used:\n{plan}')
+
+    def test_hot_queries_use_their_indexes(self):
+        day_start = timezone.now() - timedelta(days=1)
+        hot_queries = [
+            # Delivery board and polling; either status-led index serves an IN over statuses
+            ('delivery board', Order.objects.filter(status__in=BOARD_STATUSES).order_by('-created_at')[:50],
+             ['order_status_created_idx', 'order_status_updated_idx']),
+            ('delivery history', Order.objects.filter(status='delivered').order_by('-updated_at')[:50],
+             ['order_status_updated_idx']),
+            ('cart lookup', Order.objects.filter(user=self.customer, status='pending'),
+             ['order_user_status_idx']),
+            ('restaurant orders', Order.objects.filter(restaurant=self.restaurant).exclude(
+                status='pending').order_by('-created_at')[:15],
+             ['order_restaurant_created_idx']),
+            ('tracking timeline', OrderStatusEvent.objects.filter(order=self.order).order_by('created_at'),
+             ['order_event_order_created_idx']),
+            ('delivered today', OrderStatusEvent.objects.filter(
+                to_status='delivered', created_at__gte=day_start).values('order'),
+             ['order_event_status_created_idx']),
+        ]
+        for name, queryset, index_names in hot_queries:
+            with self.subTest(name):
+                self.assertUsesIndex(queryset, *index_names)
+
+
+class DeliveryStatsQueryTests(TestCase):
+    """delivery_stats is one aggregate query, shared through the cache"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.driver = User.objects.create_user('driver', 'driver@example.com', 'pw', role='delivery')
+        owner = User.objects.create_user('owner', 'owner@example.com', 'pw', role='owner')
+        customer = User.objects.create_user('customer', 'customer@example.com', 'pw', role='customer')
+        restaurant = Restaurant.objects.create(name='Stats Kitchen', owner=owner)
+        orders = {}
+        for status, count in [('ready', 3), ('picked_up', 2), ('in_transit', 1), ('delivered', 5), ('confirmed', 4),
+                              ('cancelled', 1)]:
+            orders[status] = [
+                Order.objects.create(user=customer, restaurant=restaurant, status=status, total_amount=10)
+                for _ in range(count)
+            ]
+
+        now = timezone.now()
+        delivered = orders['delivered']
+        OrderStatusEvent.objects.bulk_create(
+            [OrderStatusEvent(order=order, from_status='in_transit', to_status='delivered', created_at=now)
+             for order in delivered[:4]]
+            # Delivered twice today after a correction: still one delivery
+            + [OrderStatusEvent(order=delivered[0], from_status='confirmed', to_status='delivered', created_at=now)]
+            # Delivered yesterday
+            + [OrderStatusEvent(order=delivered[4], from_status='in_transit', to_status='delivered',
+                                created_at=now - timedelta(days=1))]
+            # Delivered today and then cancelled by an admin
+            + [OrderStatusEvent(order=order, from_status='in_transit', to_status='delivered', created_at=now)
+               for order in orders['cancelled']]
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.driver)
+
+    def test_stats_are_computed_in_one_query(self):
+        with self.assertNumQueries(1):
+            stats = _compute_delivery_stats()
+        self.assertEqual(stats, {'pending': 3, 'completed_today': 4, 'in_transit': 3, 'earnings_today': 40.0})
+
+    def test_stats_are_served_from_the_cache(self):
+        # Session, user and the aggregate
+        with self.assertNumQueries(3):
+            self.client.get('/orders/stats/')
+        # Session and user only
+        with self.assertNumQueries(2):
+            response = self.client.get('/orders/stats/')
+        self.assertEqual(response.json()['stats']['completed_today'], 4)
+
+
+class DeliveryPollQueryTests(TestCase):
+    """The delivery poll and history load 50 orders with their names in one query"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.driver = User.objects.create_user('driver', 'driver@example.com', 'pw', role='delivery')
+        owner = User.objects.create_user('owner', 'owner@example.com', 'pw', role='owner')
+        customers = [
+            User.objects.create_user(f'customer{i}', f'customer{i}@example.com', 'pw', role='customer')
+            for i in range(5)
+        ]
+        restaurants = [Restaurant.objects.create(name=f'Kitchen {i}', owner=owner) for i in range(5)]
+        # Spread over several customers and restaurants so per-row lookups would show up
+        for i in range(60):
+            for status in ['ready', 'delivered']:
+                Order.objects.create(user=customers[i % 5], restaurant=restaurants[i % 5], status=status,
+                                     total_amount=10)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.driver)
+
+    def get_orders(self, url):
+        # Session, user and the orders
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        orders = response.json()['orders']
+        self.assertEqual(len(orders), 50)
+        self.assertTrue(all(order['user'].startswith('customer') for order in orders))
+        self.assertTrue(all(order['restaurant'].startswith('Kitchen') for order in orders))
+        return response.json()
+
+    def test_board_poll(self):
+        self.get_orders('/orders/poll/')
+
+    def test_since_poll(self):
+        data = self.get_orders('/orders/poll/?since=0-0')
+        # The next page, from the returned cursor, costs the same
+        self.get_orders('/orders/poll/?since=' + data['cursor'])
+
+    def test_history(self):
+        self.get_orders('/orders/history/')
+
+    def test_bad_since_cursor(self):
+        for cursor in ['nonsense', '1-2-3', '99999999999999999999-1']:
+            response = self.client.get('/orders/poll/?since=' + cursor)
+            self.assertEqual(response.status_code, 400, cursor)
+
+
+class CartQueryTestCase(TestCase):
+    """Fixtures for filling a customer's cart with meals from several restaurants"""
+
+    CART_SIZES = [1, 10, 25]
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'pw', role='owner')
+        cls.customer = User.objects.create_user('customer', 'customer@example.com', 'pw', role='customer')
+        restaurants = [Restaurant.objects.create(name=f'Kitchen {i}', owner=owner) for i in range(3)]
+        cls.meals = [
+            Meal.objects.create(name=f'Meal {i}', description='Tasty', price=i + 1, restaurant=restaurants[i % 3])
+            for i in range(max(cls.CART_SIZES))
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.customer)
+
+    def fill_database_cart(self, meals):
+        # Checkout leaves the emptied cart in place for the next one
+        cart, _ = Order.objects.update_or_create(
+            user=self.customer, status='pending',
+            defaults={'restaurant': meals[0].restaurant, 'total_amount': sum(meal.price for meal in meals)}
+        )
+        cart.items.all().delete()
+        OrderItem.objects.bulk_create([OrderItem(order=cart, meal=meal, quantity=1, price=meal.price) for meal in meals])
+
+    def fill_session_cart(self, meals):
+        session = self.client.session
+        session[SESSION_CART_KEY] = {str(meal.id): [1, str(meal.price)] for meal in meals}
+        session.save()
+
+
+class CheckoutQueryTests(CartQueryTestCase):
+    """Checkout places a cart spanning several restaurants in a constant number of queries"""
+
+    def assert_checkout_queries(self, fill_cart, budget):
+        if not connection.features.can_return_rows_from_bulk_insert:
+            # The placed orders' ids are looked up by their checkout token
+            budget += 1
+        for size in self.CART_SIZES:
+            with self.subTest(size=size):
+                meals = self.meals[:size]
+                fill_cart(meals)
+                with self.assertNumQueries(budget):
+                    response = self.client.post('/orders/process-checkout/', {'checkout_token': str(uuid.uuid4())})
+                self.assertEqual(response.status_code, 302)
+
+                placed = Order.objects.filter(user=self.customer).exclude(status='pending')
+                self.assertEqual(placed.count(), len({meal.restaurant_id for meal in meals}))
+                self.assertEqual(OrderItem.objects.filter(order__in=placed).count(), size)
+                self.assertEqual(sum(order.total_amount for order in placed), sum(meal.price for meal in meals))
+                placed.delete()
+
+    @override_settings(ORDER_CART_BACKEND='orders.cart.DatabaseCart')
+    def test_database_cart(self):
+        # Session, user, the token check, the cart lock, the token re-check under
+        # the lock, the cart lines, the orders, their history, moving the lines,
+        # emptying the cart and the savepoint around the checkout
+        self.assert_checkout_queries(self.fill_database_cart, 12)
+
+    @override_settings(ORDER_CART_BACKEND='orders.cart.SessionCart')
+    def test_session_cart(self):
+        # Session, user, the token check, the meals, the orders, their history,
+        # the lines, saving the session and the savepoints around the checkout
+        # and the session save
+        self.assert_checkout_queries(self.fill_session_cart, 12)
+
+
+class CartPageQueryTests(CartQueryTestCase):
+    """The cart and checkout pages load the cart and its total in one query whatever its size"""
+
+    def assert_page_queries(self, url, fill_cart):
+        for size in self.CART_SIZES:
+            with self.subTest(url=url, size=size):
+                meals = self.meals[:size]
+                fill_cart(meals)
+                # The first request fills the settings and cart badge caches
+                self.client.get(url)
+                # Session, user and the cart
+                with self.assertNumQueries(3):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context['cart_items']), size)
+                self.assertEqual(Decimal(response.context['cart_total']), sum(meal.price for meal in meals))
+
+    @override_settings(ORDER_CART_BACKEND='orders.cart.DatabaseCart')
+    def test_database_cart(self):
+        self.assert_page_queries('/orders/cart/', self.fill_database_cart)
+        self.assert_page_queries('/orders/checkout/', self.fill_database_cart)
+
+    @override_settings(ORDER_CART_BACKEND='orders.cart.SessionCart')
+    def test_session_cart(self):
+        self.assert_page_queries('/orders/cart/', self.fill_session_cart)
+        self.assert_page_queries('/orders/checkout/', self.fill_session_cart)
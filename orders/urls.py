@@ -6,6 +6,7 @@ app_name = 'orders'
 urlpatterns = [
     path('', views.delivery_dashboard, name='delivery_dashboard'),
     path('poll/', views.delivery_orders_poll, name='delivery_orders_poll'),
+    path('stream/', views.delivery_orders_stream, name='delivery_orders_stream'),
     path('stats/', views.delivery_stats, name='delivery_stats'),
     path('accept/<int:order_id>/', views.delivery_accept_order, name='delivery_accept_order'),
     path('update-status/<int:order_id>/', views.delivery_update_status, name='delivery_update_status'),
@@ -18,5 +19,6 @@ urlpatterns = [
     path('remove-cart-item/<int:item_id>/', views.remove_cart_item, name='remove_cart_item'),
     path('cart-count/', views.cart_count, name='cart_count'),
     path('order-tracking/<int:order_id>/', views.order_tracking, name='order_tracking'),
+    path('order-tracking/<int:order_id>/stream/', views.order_tracking_stream, name='order_tracking_stream'),
     path('restaurant-update-status/<int:order_id>/', views.restaurant_update_status, name='restaurant_update_status'),
 ]
\ No newline at end of file
@@ -2,13 +2,52 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
-from .models import Order, OrderItem
+from django.views.decorators.http import require_http_methods, condition
+from django.views.decorators.cache import cache_control
+from .models import Order, OrderStatusEvent
+from .board import BOARD_STATUSES, get_board_version
+from .cart import get_cart, get_checkout_orders
+from .events import BOARD_CHANNEL, ORDER_CHANNEL, event_stream_response
+from .state_machine import (
+    DELIVERY_TRANSITIONS, RESTAURANT_TRANSITIONS, TransitionError, get_status_display, transition
+)
 from meals.models import Meal
 import json
+import uuid
 from admin_panel.decorators import delivery_required, delivery_forbidden
-from django.db import models
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+# Delivery dashboard stats are the same for every delivery user, so one cached
+# copy per board version is shared between them for a few seconds
+DELIVERY_STATS_CACHE_KEY = 'orders:delivery_stats:{version}'
+DELIVERY_STATS_TIMEOUT = 10
+
+# Every status an order can have once it has left the cart
+NON_CART_STATUSES = [status for status, _ in Order.STATUS_CHOICES if status != 'pending']
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _encode_poll_cursor(updated_at, order_id):
+    """Build the opaque, URL-safe delivery poll cursor for the last order sent"""
+    delta = updated_at - EPOCH
+    microseconds = (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+    return '{}-{}'.format(microseconds, order_id)
+
+
+def _decode_poll_cursor(cursor):
+    """Return the (updated_at, id) a poll cursor points at; raises ValueError"""
+    microseconds, order_id = cursor.split('-')
+    try:
+        return EPOCH + timedelta(microseconds=int(microseconds)), int(order_id)
+    except OverflowError:
+        raise ValueError(f'Poll cursor out of range: {cursor}')
 
 # Create your views here.
 @delivery_required
@@ -24,68 +63,147 @@ def delivery_dashboard(request):
     return render(request, 'orders/delivery_dashboard.html', {'orders': orders})
 
 
+def _delivery_poll_etag(request):
+    """The poll response only changes when the order board version does"""
+    if request.user.is_authenticated and request.user.role in ['delivery', 'admin']:
+        return '{}:{}'.format(get_board_version(), request.GET.get('since', ''))
+    return None
+
+
+@cache_control(private=True, no_cache=True)
 @login_required
+@condition(etag_func=_delivery_poll_etag)
 def delivery_orders_poll(request):
-    """Lightweight polling endpoint for delivery users to fetch available orders."""
+    """Lightweight polling endpoint for delivery users to fetch available orders.
+
+    Pass the previous response's ``cursor`` as ``since`` to only get orders that
+    changed after it, including ones that left the board. The cursor is an
+    opaque token made of URL-safe characters; send it back as is. Polls made with a
+    matching If-None-Match get a 304 without touching the orders table.
+    """
     if request.user.role not in ['delivery', 'admin']:
         return JsonResponse({'success': False, 'error': 'Forbidden'}, status=403)
 
+    since = request.GET.get('since') or None
+    if since:
+        try:
+            since_at, since_id = _decode_poll_cursor(since)
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'Invalid since cursor'}, status=400)
+
     try:
-        if request.user.role == 'admin':
-            orders = Order.objects.filter(status__in=['ready', 'picked_up', 'in_transit']).order_by('-created_at')[:50]
+        # Admin and delivery see the same board; join the customer and restaurant
+        # names in the same query and serialize straight from the row tuples
+        if since:
+            # Oldest changes first, keyed on (updated_at, id) so the cursor moves
+            # forward even through a batch of orders sharing one updated_at
+            orders = Order.objects.filter(status__in=NON_CART_STATUSES).filter(
+                Q(updated_at__gt=since_at) | Q(updated_at=since_at, id__gt=since_id)
+            ).order_by('updated_at', 'id')
         else:
-            orders = Order.objects.filter(status__in=['ready', 'picked_up', 'in_transit']).order_by('-created_at')[:50]
-
-        data = []
-        for o in orders:
-            data.append({
-                'id': o.id,
-                'status': o.status,
-                'total_amount': float(o.total_amount),
-                'created_at': o.created_at.isoformat() if hasattr(o.created_at, 'isoformat') else str(o.created_at),
-                'user': getattr(o.user, 'username', None),
-                'restaurant': getattr(getattr(o, 'restaurant', None), 'name', None),
-            })
+            orders = Order.objects.filter(status__in=BOARD_STATUSES).order_by('-created_at')
+        rows = list(orders.values_list(
+            'id', 'status', 'total_amount', 'created_at', 'updated_at', 'user__username', 'restaurant__name'
+        )[:50])
+
+        data = [
+            {
+                'id': order_id,
+                'status': status,
+                'total_amount': float(total_amount),
+                'created_at': created_at.isoformat(),
+                'updated_at': updated_at.isoformat(),
+                'user': username,
+                'restaurant': restaurant_name,
+            }
+            for order_id, status, total_amount, created_at, updated_at, username, restaurant_name in rows
+        ]
+        if since:
+            cursor = _encode_poll_cursor(rows[-1][4], rows[-1][0]) if rows else since
+        else:
+            # The board is newest first; start deltas from the latest change on it
+            latest = max(rows, key=lambda row: (row[4], row[0]), default=None)
+            cursor = _encode_poll_cursor(latest[4], latest[0]) if latest else None
 
-        return JsonResponse({'success': True, 'orders': data})
+        return JsonResponse({
+            'success': True,
+            'orders': data,
+            'cursor': cursor,
+        })
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
+async def delivery_orders_stream(request):
+    """Server-Sent Events stream pushing order status changes to the delivery board.
+
+    Needs an ASGI server; under WSGI it answers 501 and the dashboard keeps polling.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'success': False, 'error': 'Streaming requires an ASGI server'}, status=501)
+
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'success': False, 'error': 'Authentication required'}, status=401)
+    if user.role not in ['delivery', 'admin']:
+        return JsonResponse({'success': False, 'error': 'Forbidden'}, status=403)
+
+    return event_stream_response(BOARD_CHANNEL, user.id)
+
+
 @login_required
 def delivery_stats(request):
     """Stats for delivery dashboard cards. Uses existing statuses mapping.
-    - Pending Orders: orders with status 'confirmed'
+    - Pending Orders: orders with status 'ready'
     - Completed Today: delivered today
-    - In Transit: orders with status 'ready' (proxy for picked up/on the way)
+    - In Transit: orders with status 'picked_up' or 'in_transit'
     - Earnings Today: sum of delivered today total_amount
-    Admin sees across platform; Delivery sees confirmed/ready/delivered.
+    Admin and delivery see the same platform-wide numbers, so they are computed
+    once and cached per order board version.
     """
     if request.user.role not in ['delivery', 'admin']:
         return JsonResponse({'success': False, 'error': 'Forbidden'}, status=403)
     try:
-        from django.utils import timezone
-        today = timezone.now().date()
-        # For now the same scope for admin and delivery until assignment implemented
-        base_qs = Order.objects.all()
-
-        pending_count = base_qs.filter(status='ready').count()  # Orders ready for delivery pickup
-        completed_today = base_qs.filter(status='delivered', updated_at__date=today).count()
-        in_transit = base_qs.filter(status__in=['picked_up', 'in_transit']).count()  # Orders currently being delivered
-        earnings_today = base_qs.filter(status='delivered', updated_at__date=today).aggregate(total=models.Sum('total_amount'))['total'] or 0
+        key = DELIVERY_STATS_CACHE_KEY.format(version=get_board_version())
+        stats = cache.get(key)
+        if stats is None:
+            stats = _compute_delivery_stats()
+            cache.set(key, stats, DELIVERY_STATS_TIMEOUT)
 
-        return JsonResponse({
-            'success': True,
-            'stats': {
-                'pending': pending_count,
-                'completed_today': completed_today,
-                'in_transit': in_transit,
-                'earnings_today': float(earnings_today),
-            }
-        })
+        return JsonResponse({'success': True, 'stats': stats})
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
+
+def _compute_delivery_stats():
+    """Compute the delivery dashboard numbers with one aggregate query.
+
+    Board counts come from the orders' current status; today's deliveries are
+    the orders delivered today, per the status history, that are still delivered.
+    """
+    day_start = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+    day_end = day_start + timedelta(days=1)
+
+    # An order delivered twice in a day (e.g. after an admin correction) counts once
+    delivered_today = OrderStatusEvent.objects.filter(
+        to_status='delivered', created_at__gte=day_start, created_at__lt=day_end
+    ).values('order')
+    # An order delivered and then cancelled by an admin no longer counts
+    completed = Q(status='delivered', id__in=delivered_today)
+    stats = Order.objects.filter(Q(status__in=BOARD_STATUSES) | completed).aggregate(
+        pending=Count('id', filter=Q(status='ready')),  # Orders ready for delivery pickup
+        in_transit=Count('id', filter=Q(status__in=['picked_up', 'in_transit'])),  # Orders currently being delivered
+        completed_today=Count('id', filter=completed),
+        earnings_today=Sum('total_amount', filter=completed),
+    )
+    return {
+        'pending': stats['pending'],
+        'completed_today': stats['completed_today'],
+        'in_transit': stats['in_transit'],
+        'earnings_today': float(stats['earnings_today'] or 0),
+    }
+
+
 @login_required
 @require_http_methods(["POST"])
 def delivery_accept_order(request, order_id):
@@ -94,14 +212,16 @@ def delivery_accept_order(request, order_id):
         return JsonResponse({'success': False, 'error': 'Forbidden'}, status=403)
 
     try:
-        order = get_object_or_404(Order, id=order_id)
-        # Delivery can only accept orders that are ready (restaurant finished preparing)
-        if order.status != 'ready':
-            return JsonResponse({'success': False, 'error': 'Order must be ready for pickup before delivery can accept it'}, status=400)
-
-        order.status = 'picked_up'
-        order.save()
-        return JsonResponse({'success': True, 'order_id': order.id, 'status': order.status})
+        # Delivery can only accept orders that are ready (restaurant finished preparing).
+        # The state machine claims it with a conditional UPDATE so concurrent drivers can't both win.
+        transition(order_id, 'picked_up', DELIVERY_TRANSITIONS)
+        return JsonResponse({'success': True, 'order_id': order_id, 'status': 'picked_up'})
+    except Order.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Order not found'}, status=404)
+    except TransitionError as e:
+        if e.current_status in ['picked_up', 'in_transit', 'delivered']:
+            return JsonResponse({'success': False, 'error': 'Order has already been accepted by another driver'}, status=409)
+        return JsonResponse({'success': False, 'error': 'Order must be ready for pickup before delivery can accept it'}, status=400)
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
@@ -113,7 +233,6 @@ def delivery_update_status(request, order_id):
     if request.user.role not in ['delivery', 'admin']:
         return JsonResponse({'success': False, 'error': 'Forbidden'}, status=403)
     try:
-        order = get_object_or_404(Order, id=order_id)
         try:
             data = json.loads(request.body or '{}')
         except Exception:
@@ -123,21 +242,12 @@ def delivery_update_status(request, order_id):
         if new_status not in allowed:
             return JsonResponse({'success': False, 'error': 'Invalid status'}, status=400)
 
-        # Basic linear flow guard
-        flow_index = {
-            'confirmed': 0, 'preparing': 0,
-            'picked_up': 1,
-            'in_transit': 2,
-            'delivered': 3
-        }
-        current_idx = flow_index.get(order.status, 0)
-        target_idx = flow_index.get(new_status, 0)
-        if target_idx < current_idx:
-            return JsonResponse({'success': False, 'error': 'Cannot move status backwards'}, status=400)
-
-        order.status = new_status
-        order.save()
-        return JsonResponse({'success': True, 'order_id': order.id, 'status': order.status})
+        transition(order_id, new_status, DELIVERY_TRANSITIONS)
+        return JsonResponse({'success': True, 'order_id': order_id, 'status': new_status})
+    except Order.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Order not found'}, status=404)
+    except TransitionError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
@@ -148,16 +258,19 @@ def delivery_history(request):
     if request.user.role not in ['delivery', 'admin']:
         return JsonResponse({'success': False, 'error': 'Forbidden'}, status=403)
     try:
-        orders = Order.objects.filter(status='delivered').order_by('-updated_at')[:50]
-        items = []
-        for o in orders:
-            items.append({
-                'id': o.id,
-                'user': getattr(o.user, 'username', None),
-                'restaurant': getattr(getattr(o, 'restaurant', None), 'name', None),
-                'total_amount': float(o.total_amount),
-                'updated_at': o.updated_at.isoformat() if hasattr(o.updated_at, 'isoformat') else str(o.updated_at)
-            })
+        rows = Order.objects.filter(status='delivered').order_by('-updated_at').values_list(
+            'id', 'user__username', 'restaurant__name', 'total_amount', 'updated_at'
+        )[:50]
+        items = [
+            {
+                'id': order_id,
+                'user': username,
+                'restaurant': restaurant_name,
+                'total_amount': float(total_amount),
+                'updated_at': updated_at.isoformat()
+            }
+            for order_id, username, restaurant_name, total_amount, updated_at in rows
+        ]
         return JsonResponse({'success': True, 'orders': items})
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
@@ -166,17 +279,11 @@ def delivery_history(request):
 @login_required
 @require_http_methods(["POST"])
 def restaurant_update_status(request, order_id):
-    """Allow restaurant owner to update order status from preparing to ready."""
+    """Allow restaurant owner to move an order through confirmed → preparing → ready, or cancel it."""
     if request.user.role != 'owner':
         return JsonResponse({'success': False, 'error': 'Only restaurant owners can update order status'}, status=403)
     
     try:
-        order = get_object_or_404(Order, id=order_id)
-        
-        # Verify the order belongs to this restaurant owner
-        if not order.restaurant or order.restaurant.owner != request.user:
-            return JsonResponse({'success': False, 'error': 'You can only update orders for your restaurant'}, status=403)
-        
         try:
             data = json.loads(request.body or '{}')
         except Exception:
@@ -184,23 +291,23 @@ def restaurant_update_status(request, order_id):
         
         new_status = data.get('status')
         
-        # Restaurant owners can only transition from 'preparing' to 'ready'
-        if order.status != 'preparing':
-            return JsonResponse({'success': False, 'error': 'Order must be in preparing status to mark as ready'}, status=400)
-        
-        if new_status != 'ready':
-            return JsonResponse({'success': False, 'error': 'Restaurant owners can only mark orders as ready'}, status=400)
-        
-        order.status = 'ready'
-        order.save()
+        # Owners only see orders for their own restaurant
+        transition(
+            order_id, new_status, RESTAURANT_TRANSITIONS,
+            queryset=Order.objects.filter(restaurant__owner=request.user)
+        )
         
         return JsonResponse({
             'success': True, 
-            'order_id': order.id, 
-            'status': order.status,
-            'status_display': order.get_status_display()
+            'order_id': order_id, 
+            'status': new_status,
+            'status_display': get_status_display(new_status)
         })
         
+    except Order.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Order not found'}, status=404)
+    except TransitionError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
@@ -208,13 +315,8 @@ def restaurant_update_status(request, order_id):
 @delivery_forbidden
 def cart_view(request):
     """Display shopping cart"""
-    # Get cart items for the current user
-    cart_items = OrderItem.objects.filter(order__user=request.user, order__status='pending')
-    
-    # Calculate cart total properly
-    cart_total = 0
-    for item in cart_items:
-        cart_total += float(item.total_price)
+    # Get cart items for the current user, with the cart total
+    cart_items, cart_total = get_cart(request).contents()
     
     context = {
         'cart_items': cart_items,
@@ -227,17 +329,18 @@ def cart_view(request):
 @delivery_forbidden
 def checkout_view(request):
     """Display checkout form"""
-    # Get cart items for the current user
-    cart_items = OrderItem.objects.filter(order__user=request.user, order__status='pending')
-    cart_total = sum(item.total_price for item in cart_items)
+    # Get cart items for the current user, with the cart total
+    cart_items, cart_total = get_cart(request).contents()
     
-    if not cart_items.exists():
+    if not cart_items:
         messages.warning(request, 'Your cart is empty. Add some items before checkout.')
         return redirect('meals:meal_list')
     
     context = {
         'cart_items': cart_items,
         'cart_total': cart_total,
+        # Idempotency key for this checkout; resubmitting the form reuses it
+        'checkout_token': uuid.uuid4(),
     }
     return render(request, 'orders/checkout.html', context)
 
@@ -247,34 +350,33 @@ def checkout_view(request):
 def process_checkout(request):
     """Process checkout and create order"""
     if request.method == 'POST':
-        # Get cart items
-        cart_items = OrderItem.objects.filter(order__user=request.user, order__status='pending')
-        
-        if not cart_items.exists():
-            messages.error(request, 'Your cart is empty.')
-            return redirect('orders:cart')
-        
         # (Form fields omitted for brevity; not used by current flow)
         
-        # Calculate total
-        total_amount = sum(item.total_price for item in cart_items)
+        try:
+            token = uuid.UUID(request.POST.get('checkout_token', ''))
+        except ValueError:
+            token = None
         
-        # Create order
-        order = Order.objects.create(
-            user=request.user,
-            restaurant=cart_items.first().meal.restaurant,
-            status='confirmed',
-            total_amount=total_amount
-        )
+        # A retried submission gets the orders it already placed
+        placed = get_checkout_orders(request.user, token)
+        if placed:
+            return redirect('orders:checkout_success', order_id=placed[0].id)
+        
+        # Turn the cart into one order per restaurant, wherever the cart is stored
+        orders = get_cart(request).checkout(token)
         
-        # Update cart items to belong to this order
-        cart_items.update(order=order)
+        if not orders:
+            messages.error(request, 'Your cart is empty.')
+            return redirect('orders:cart')
         
         # Store delivery information (you might want to create a separate model for this)
         # For now, we'll just redirect to success page
         
-        messages.success(request, 'Order placed successfully!')
-        return redirect('orders:checkout_success', order_id=order.id)
+        if len(orders) > 1:
+            messages.success(request, f'Order placed successfully! It was split into {len(orders)} orders, one per restaurant.')
+        else:
+            messages.success(request, 'Order placed successfully!')
+        return redirect('orders:checkout_success', order_id=orders[0].id)
     
     return redirect('orders:checkout')
 
@@ -297,8 +399,6 @@ def checkout_success(request, order_id):
 def update_cart_item(request, item_id):
     """Update cart item quantity via AJAX"""
     try:
-        item = get_object_or_404(OrderItem, id=item_id, order__user=request.user)
-        
         # Handle both FormData and JSON data
         if request.content_type == 'application/x-www-form-urlencoded' or 'multipart/form-data' in request.content_type:
             quantity = int(request.POST.get('quantity', 1))
@@ -307,16 +407,12 @@ def update_cart_item(request, item_id):
             quantity = int(data.get('quantity', 1))
         
         if 1 <= quantity <= 25:
-            item.quantity = quantity
-            item.save()
-            
-            # Calculate subtotal manually since total_price is a property
-            subtotal = sum(float(order_item.price * order_item.quantity) for order_item in OrderItem.objects.filter(order=item.order))
+            total_price, subtotal = get_cart(request).update(item_id, quantity)
             
             return JsonResponse({
                 'success': True,
-                'total_price': float(item.total_price),
-                'subtotal': subtotal
+                'total_price': float(total_price),
+                'subtotal': float(subtotal)
             })
         else:
             return JsonResponse({'success': False, 'error': 'Invalid quantity'})
@@ -330,13 +426,7 @@ def update_cart_item(request, item_id):
 def remove_cart_item(request, item_id):
     """Remove item from cart via AJAX"""
     try:
-        item = get_object_or_404(OrderItem, id=item_id, order__user=request.user, order__status='pending')
-        order = item.order
-        item.delete()
-        
-        # Update order total
-        order.total_amount = sum(item.total_price for item in order.items.all())
-        order.save()
+        get_cart(request).remove(item_id)
         
         return JsonResponse({
             'success': True,
@@ -350,7 +440,7 @@ def remove_cart_item(request, item_id):
 @login_required
 def cart_count(request):
     """Get cart item count for navigation"""
-    count = OrderItem.objects.filter(order__user=request.user, order__status='pending').count()
+    count = get_cart(request).badge_count()
     return JsonResponse({'count': count})
 
 
@@ -361,39 +451,53 @@ def order_tracking(request, order_id):
     # 1. User owns the order, OR
     # 2. User is restaurant owner and order is from their restaurant, OR  
     # 3. User is admin
-    try:
-        if request.user.role == 'admin':
-            # Admin can see any order
-            order = get_object_or_404(Order, id=order_id)
-        elif request.user.role == 'owner':
-            # Restaurant owner can see orders from their restaurant or their own orders
-            from restaurants.models import Restaurant
-            restaurant = Restaurant.objects.filter(owner=request.user).first()
-            order = get_object_or_404(Order, id=order_id)
-            
-            # Check if user owns the order OR order is from their restaurant
-            if order.user != request.user and (not restaurant or order.restaurant != restaurant):
-                raise PermissionError("You don't have permission to view this order")
-        else:
-            # Regular users can only see their own orders
-            order = get_object_or_404(Order, id=order_id, user=request.user)
-    except PermissionError:
-        from django.http import Http404
-        raise Http404("Order not found or you don't have permission to view it")
-    
-    # Calculate order statistics
-    total_items = sum(item.quantity for item in order.items.all())
+    # The check and the item count are part of the query that loads the order.
+    orders = Order.objects.select_related('restaurant').annotate(
+        items_count=Coalesce(Sum('items__quantity'), 0)
+    )
+    if request.user.role != 'admin':
+        orders = orders.filter(Q(user=request.user) | Q(restaurant__owner=request.user))
+    order = get_object_or_404(orders, id=order_id)
     
     # Check if current user is the restaurant owner of this order
     is_restaurant_owner = (
         request.user.role == 'owner' and 
-        order.restaurant and 
-        order.restaurant.owner == request.user
+        order.restaurant is not None and 
+        order.restaurant.owner_id == request.user.id
+    )
+    
+    # When the order last reached each status, read off the (order, created_at) index
+    status_times = dict(
+        order.status_events.order_by('created_at').values_list('to_status', 'created_at')
     )
     
     context = {
         'order': order,
-        'total_items': total_items,
+        'order_items': order.items.select_related('meal__restaurant'),
+        'total_items': order.items_count,
         'is_restaurant_owner': is_restaurant_owner,
+        'status_times': status_times,
     }
     return render(request, 'orders/order_tracking.html', context)
+
+
+async def order_tracking_stream(request, order_id):
+    """Server-Sent Events stream of status changes for one order's tracking page.
+
+    Open to the same users as order_tracking; needs an ASGI server and answers
+    501 under WSGI so the page simply stays static.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'success': False, 'error': 'Streaming requires an ASGI server'}, status=501)
+
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'success': False, 'error': 'Authentication required'}, status=401)
+
+    orders = Order.objects.filter(id=order_id)
+    if user.role != 'admin':
+        orders = orders.filter(Q(user=user) | Q(restaurant__owner=user))
+    if not await orders.aexists():
+        return JsonResponse({'success': False, 'error': 'Order not found'}, status=404)
+
+    return event_stream_response(ORDER_CHANNEL.format(order_id=order_id), user.id)
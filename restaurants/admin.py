@@ -3,7 +3,10 @@ from django.utils.html import format_html
 from django.urls import reverse
 from django.db import models
 from .models import Restaurant
+from .kpis import invalidate_restaurant_kpis
 from meals.models import Meal
+from meals.sampling import invalidate_meal_id_pool
+from admin_panel.cache import invalidate_public_pages
 
 # Inline admin for meals
 class MealInline(admin.TabularInline):
@@ -63,6 +66,10 @@ class RestaurantAdmin(admin.ModelAdmin):
         """Bulk action to activate all meals in selected restaurants"""
         for restaurant in queryset:
             restaurant.meal_set.update(is_available=True)
+            invalidate_restaurant_kpis(restaurant.id)
+        # update() skips the meal_changed receiver
+        invalidate_meal_id_pool()
+        invalidate_public_pages()
         self.message_user(request, f'All meals in {queryset.count()} restaurants were activated.')
     activate_restaurant.short_description = "Activate all meals in selected restaurants"
     
@@ -70,5 +77,9 @@ class RestaurantAdmin(admin.ModelAdmin):
         """Bulk action to deactivate all meals in selected restaurants"""
         for restaurant in queryset:
             restaurant.meal_set.update(is_available=False)
+            invalidate_restaurant_kpis(restaurant.id)
+        # update() skips the meal_changed receiver
+        invalidate_meal_id_pool()
+        invalidate_public_pages()
         self.message_user(request, f'All meals in {queryset.count()} restaurants were deactivated.')
     deactivate_restaurant.short_description = "Deactivate all meals in selected restaurants"
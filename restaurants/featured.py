@@ -0,0 +1,55 @@
+import random
+import time
+import uuid
+
+from django.core.cache import cache
+
+from .models import Restaurant
+
+# Shuffled pool of restaurant IDs the home page rotates through. The pool is
+# reshuffled when it expires or a restaurant changes, and each rotation slot
+# caches the restaurants it shows so the home page needs no restaurant query.
+FEATURED_POOL_KEY = 'restaurants:featured_pool'
+FEATURED_POOL_TIMEOUT = 60 * 60
+FEATURED_ROTATION_SECONDS = 60 * 5
+FEATURED_COUNT = 6
+
+
+def get_featured_pool():
+    """Return the (version, restaurant IDs) pair for the cached, shuffled pool"""
+    pool = cache.get(FEATURED_POOL_KEY)
+    if pool is None:
+        restaurant_ids = list(Restaurant.objects.values_list('id', flat=True))
+        random.shuffle(restaurant_ids)
+        pool = (uuid.uuid4().hex, restaurant_ids)
+        cache.set(FEATURED_POOL_KEY, pool, FEATURED_POOL_TIMEOUT)
+    return pool
+
+
+def invalidate_featured_pool():
+    """Drop the cached pool so the next home page reshuffles it"""
+    cache.delete(FEATURED_POOL_KEY)
+
+
+def get_current_slot():
+    """Return the number of the rotation window we are in"""
+    return int(time.time() // FEATURED_ROTATION_SECONDS)
+
+
+def get_featured_restaurants(count=FEATURED_COUNT):
+    """Return the restaurants featured in the current rotation window"""
+    version, restaurant_ids = get_featured_pool()
+    if not restaurant_ids:
+        return []
+    
+    slot = get_current_slot()
+    key = f'restaurants:featured:{version}:{slot}:{count}'
+    featured = cache.get(key)
+    if featured is None:
+        # Walk through the pool a page at a time so every restaurant gets its turn
+        offset = (slot * count) % len(restaurant_ids)
+        window = (restaurant_ids[offset:] + restaurant_ids[:offset])[:count]
+        restaurants_by_id = Restaurant.objects.in_bulk(window)
+        featured = [restaurants_by_id[restaurant_id] for restaurant_id in window if restaurant_id in restaurants_by_id]
+        cache.set(key, featured, FEATURED_ROTATION_SECONDS)
+    return featured
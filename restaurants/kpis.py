@@ -0,0 +1,49 @@
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+
+from meals.models import Meal
+from orders.models import Order
+
+# Headline numbers for a restaurant's owner pages. They are cached per
+# restaurant and dropped whenever one of its meals or placed orders changes;
+# the timeout only bounds how stale a change made with a queryset update()
+# elsewhere can leave them.
+RESTAURANT_KPIS_CACHE_KEY = 'restaurants:kpis:{restaurant_id}'
+RESTAURANT_KPIS_TIMEOUT = 60 * 10
+
+
+def get_restaurant_kpis(restaurant_id):
+    """Return the meal and order counts and revenue for a restaurant"""
+    key = RESTAURANT_KPIS_CACHE_KEY.format(restaurant_id=restaurant_id)
+    kpis = cache.get(key)
+    if kpis is None:
+        kpis = compute_restaurant_kpis(restaurant_id)
+        cache.set(key, kpis, RESTAURANT_KPIS_TIMEOUT)
+    return kpis
+
+
+def compute_restaurant_kpis(restaurant_id):
+    """Compute the restaurant's numbers with one aggregate query per table"""
+    meals = Meal.objects.filter(restaurant_id=restaurant_id).aggregate(
+        total_meals=Count('id'),
+        available_meals=Count('id', filter=Q(is_available=True)),
+    )
+    # Pending orders are carts, not orders the restaurant received
+    orders = Order.objects.filter(restaurant_id=restaurant_id).exclude(status='pending').aggregate(
+        total_orders=Count('id'),
+        total_revenue=Sum('total_amount'),
+    )
+    return {
+        'total_meals': meals['total_meals'],
+        'available_meals': meals['available_meals'],
+        'total_orders': orders['total_orders'],
+        'total_revenue': orders['total_revenue'] or 0,
+    }
+
+
+def invalidate_restaurant_kpis(*restaurant_ids):
+    """Drop the cached numbers of the given restaurants"""
+    cache.delete_many([
+        RESTAURANT_KPIS_CACHE_KEY.format(restaurant_id=restaurant_id)
+        for restaurant_id in restaurant_ids if restaurant_id is not None
+    ])
@@ -0,0 +1,15 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from admin_panel.cache import invalidate_public_pages
+from .models import Restaurant
+from .featured import invalidate_featured_pool
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def restaurant_changed(sender, instance, **kwargs):
+    """Reshuffle the featured rotation and drop public pages showing the restaurant"""
+    transaction.on_commit(invalidate_featured_pool)
+    transaction.on_commit(invalidate_public_pages)
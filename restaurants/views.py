@@ -1,14 +1,17 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Sum, Count, Avg
+from django.db.models import Count, Avg
 from django.core.paginator import Paginator
 from django.http import JsonResponse
 from .models import Restaurant
 from .forms import RestaurantForm
+from .kpis import get_restaurant_kpis
 from meals.models import Meal
 from meals.forms import MealForm, MealSearchForm
 from orders.models import Order
+from orders.state_machine import RESTAURANT_TRANSITIONS, TransitionError, get_status_display, transition
+from admin_panel.cache import public_page_cache
 
 
 @login_required
@@ -53,15 +56,18 @@ def restaurant_dashboard(request, restaurant_id=None):
                 restaurant = restaurants.first()
         else:
             restaurants = Restaurant.objects.filter(owner=request.user)
-            restaurant = restaurants.first() if restaurants.exists() else None
+            restaurant = restaurants.first()
     
     # Get meals for the restaurant with pagination
     meals = []
     recent_orders = []
     meals_paginator = None
     meals_page_obj = None
+    kpis = None
     
     if restaurant:
+        kpis = get_restaurant_kpis(restaurant.id)
+        
         # Get all meals for pagination
         all_meals = Meal.objects.filter(restaurant=restaurant).order_by('-created_at')
         meals_paginator = Paginator(all_meals, 5)
@@ -69,13 +75,17 @@ def restaurant_dashboard(request, restaurant_id=None):
         meals_page_obj = meals_paginator.get_page(page_number)
         meals = meals_page_obj
         
-        recent_orders = Order.objects.filter(restaurant=restaurant).select_related('user').order_by('-created_at')[:5]
+        # Pending orders are customers' carts, not orders the restaurant received
+        recent_orders = Order.objects.filter(restaurant=restaurant).exclude(status='pending').select_related(
+            'user'
+        ).order_by('-created_at')[:5]
     
     context = {
         'restaurant': restaurant,
         'restaurants': restaurants,
         'meals': meals,
         'recent_orders': recent_orders,
+        'kpis': kpis,
         'meals_page_obj': meals_page_obj,
         'meals_paginator': meals_paginator,
         'is_meals_paginated': meals_page_obj.has_other_pages() if meals_page_obj else False,
@@ -321,20 +331,15 @@ def restaurant_settings(request, restaurant_id=None):
         form = RestaurantForm(instance=restaurant)
     
     # Get restaurant statistics
-    total_meals = Meal.objects.filter(restaurant=restaurant).count()
-    available_meals = Meal.objects.filter(restaurant=restaurant, is_available=True).count()
-    total_orders = Order.objects.filter(restaurant=restaurant).count()
-    total_revenue = Order.objects.filter(restaurant=restaurant).aggregate(
-        total=Sum('total_amount')
-    )['total'] or 0
+    kpis = get_restaurant_kpis(restaurant.id)
     
     context = {
         'form': form,
         'restaurant': restaurant,
-        'total_meals': total_meals,
-        'available_meals': available_meals,
-        'total_orders': total_orders,
-        'total_revenue': total_revenue,
+        'total_meals': kpis['total_meals'],
+        'available_meals': kpis['available_meals'],
+        'total_orders': kpis['total_orders'],
+        'total_revenue': kpis['total_revenue'],
     }
     return render(request, 'restaurants/restaurant_settings.html', context)
 
@@ -371,8 +376,10 @@ def restaurant_orders(request, restaurant_id=None):
         messages.error(request, 'No restaurant found.')
         return redirect('restaurants:restaurant_dashboard')
     
-    # Get orders
-    orders = Order.objects.filter(restaurant=restaurant).select_related('user').order_by('-created_at')
+    # Get orders, leaving out customers' carts
+    orders = Order.objects.filter(restaurant=restaurant).exclude(status='pending').select_related(
+        'user'
+    ).order_by('-created_at')
     
     # Pagination
     paginator = Paginator(orders, 15)
@@ -438,13 +445,6 @@ def restaurant_update_order_status(request, order_id):
         return JsonResponse({'success': False, 'error': 'POST method required'}, status=405)
     
     try:
-        # Get the order and verify it belongs to this restaurant owner
-        if request.user.role == 'admin':
-            order = get_object_or_404(Order, id=order_id)
-        else:
-            # Ensure the order belongs to one of the current owner's restaurants
-            order = get_object_or_404(Order, id=order_id, restaurant__owner=request.user)
-        
         import json
         try:
             data = json.loads(request.body)
@@ -453,33 +453,30 @@ def restaurant_update_order_status(request, order_id):
         
         new_status = data.get('status')
         
-        # Validate status transitions for restaurant owners
-        valid_transitions = {
-            'pending': ['confirmed', 'cancelled'],
-            'confirmed': ['preparing', 'cancelled'],
-            'preparing': ['ready', 'cancelled']
-        }
-        
-        if order.status not in valid_transitions:
-            return JsonResponse({'success': False, 'error': f'Cannot update order from {order.status} status'}, status=400)
-        
-        if new_status not in valid_transitions[order.status]:
-            return JsonResponse({'success': False, 'error': f'Invalid status transition from {order.status} to {new_status}'}, status=400)
+        # Admins can update any order; owners only orders of their own restaurants
+        if request.user.role == 'admin':
+            orders = Order.objects.all()
+        else:
+            orders = Order.objects.filter(restaurant__owner=request.user)
         
-        order.status = new_status
-        order.save()
+        transition(order_id, new_status, RESTAURANT_TRANSITIONS, queryset=orders)
         
         return JsonResponse({
             'success': True,
-            'order_id': order.id,
-            'status': order.status,
-            'status_display': order.get_status_display()
+            'order_id': order_id,
+            'status': new_status,
+            'status_display': get_status_display(new_status)
         })
         
+    except Order.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Order not found'}, status=404)
+    except TransitionError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
+@public_page_cache()
 def restaurant_detail(request, restaurant_id):
     """Public restaurant detail page for customers"""
     restaurant = get_object_or_404(Restaurant, id=restaurant_id)
@@ -7,8 +7,11 @@ class CartManager {
     }
 
     init() {
-        // Initialize cart counter on page load
-        this.updateCartCounter();
+        // Initialize cart counter on page load, unless the server already rendered it
+        const counter = document.querySelector('#cartCount');
+        if (!counter || counter.dataset.count === undefined || counter.dataset.count === '') {
+            this.updateCartCounter();
+        }
         // Initialize all row totals on page load
         this.updateAllRowTotals();
         // Initialize cart total on page load
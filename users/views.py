@@ -14,6 +14,7 @@ from .models import User
 from restaurants.models import Restaurant
 from meals.models import Meal
 from orders.models import Order
+from admin_panel.cache import public_page_cache
 
 
 class CustomUserCreationForm(UserCreationForm):
@@ -140,16 +141,18 @@ def profile_view(request):
     return render(request, 'users/profile.html', context)
 
 
+@public_page_cache(timeout=60)
 def home_view(request):
-    from restaurants.models import Restaurant
-    # Get 6 random featured restaurants for the home page
-    featured_restaurants = Restaurant.objects.order_by('?')[:6]
+    from restaurants.featured import get_featured_restaurants
+    # Get the 6 featured restaurants from the cached rotation
+    featured_restaurants = get_featured_restaurants()
     context = {
         'featured_restaurants': featured_restaurants,
     }
     return render(request, 'users/home.html', context)
 
 
+@public_page_cache()
 def all_restaurants_view(request):
     """Display all restaurants with pagination"""
     from restaurants.models import Restaurant